@@ -0,0 +1,110 @@
+import numpy as np
+
+import config
+from filters import SATISFIES
+from filters import FAILS
+from filters import UNKNOWN
+from filters import filter_key
+from filters import decode_filter_set
+from filters import batch_categorize
+from table import to_records
+
+# Category names of the filter API by category code
+CATEGORY_KEYS = {SATISFIES: "satisfies", FAILS: "fails", UNKNOWN: "unknown"}
+
+#################### Helper Functions ####################
+
+#1) Filter sets of a request
+def parse_queries(body, stats):
+    """Returns [(features, bounds), ...] of the request filter sets, raises ValueError for malformed sets and unknown features."""
+    queries = body.get("queries")
+    if not isinstance(queries, list):
+        raise ValueError("queries must be a list of filter sets")
+    if len(queries) > config.API_MAX_QUERIES:
+        raise ValueError(f"At most {config.API_MAX_QUERIES} filter sets per request")
+
+    parsed = [decode_filter_set(query) for query in queries]
+    unknown = {feat for features, _ in parsed for feat in features if feat not in stats}
+    if unknown:
+        raise ValueError(f"Unknown features: {sorted(unknown)}")
+    return parsed
+
+#2) Row output options of a request
+def parse_options(body, dataframe):
+    """Returns (categories whose rows are returned, include ids, projected columns, row limit) of the request."""
+    categories = body.get("rows", ["satisfies"])
+    if not isinstance(categories, list) or not all(isinstance(key, str) for key in categories) or not set(categories) <= set(CATEGORY_KEYS.values()):
+        raise ValueError(f"rows must be a list of {list(CATEGORY_KEYS.values())}")
+    codes = [code for code, key in CATEGORY_KEYS.items() if key in categories]
+
+    columns = body.get("columns", [])
+    if not isinstance(columns, list) or any(not isinstance(col, str) or col not in dataframe.columns for col in columns):
+        raise ValueError("columns must be a list of dataset columns")
+
+    limit = body.get("limit", config.API_ROW_LIMIT)
+    # bool is an int subclass, true is not a row limit
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 0 <= limit <= config.API_ROW_LIMIT:
+        raise ValueError(f"limit must be an integer between 0 and {config.API_ROW_LIMIT}")
+
+    return codes, bool(body.get("ids", False)), columns, limit
+
+#################### Filter API ####################
+
+def run_batch(dataset, body):
+    """
+    Returns per-category row counts of every filter set of the request, and optionally ids and a projection of the rows in the requested categories. Distinct filter sets are evaluated together in one pass
+    """
+    dataframe = dataset.dataframe
+    queries = parse_queries(body, dataset.stats)
+    codes_wanted, with_ids, columns, limit = parse_options(body, dataframe)
+
+    # identical filter sets are evaluated once
+    distinct = {}
+    for features, bounds in queries:
+        distinct.setdefault(filter_key(features, bounds), (features, bounds))
+    keys = list(distinct)
+    slot = {key: ind for ind, key in enumerate(keys)}
+    query_slots = [slot[filter_key(features, bounds)] for features, bounds in queries]
+
+    need_rows = bool((with_ids or columns) and codes_wanted and limit > 0)
+
+    # with COLUMN_INDEXES enabled, counts of single filter sets come from the column index by binary search, the others are evaluated in one pass
+    indexed = [] if need_rows else [
+        ind for ind, key in enumerate(keys)
+        if len(key) == 1 and key[0][0] in dataset.indexes
+    ]
+    scanned = sorted(set(range(len(keys))) - set(indexed))
+
+    counts = np.zeros((len(keys), 3), dtype=np.int64)
+    for ind in indexed:
+        feat, lb, ub = keys[ind][0]
+        index_counts = dataset.indexes[feat].counts(lb, ub)
+        counts[ind] = [index_counts[CATEGORY_KEYS[code]] for code in sorted(CATEGORY_KEYS)]
+
+    scanned_counts, scanned_rows = batch_categorize(
+        dataframe,
+        [distinct[keys[ind]] for ind in scanned],
+        keep=range(len(scanned)) if need_rows else (),
+        categories=codes_wanted,
+        limit=limit
+    )
+    counts[scanned] = scanned_counts
+    rows = {scanned[ind]: positions for ind, positions in scanned_rows.items()}
+
+    id_column = dataframe.columns[0]
+    results = []
+    for ind in query_slots:
+        result = {"counts": {CATEGORY_KEYS[code]: int(counts[ind, code]) for code in CATEGORY_KEYS}}
+        if need_rows:
+            positions = rows[ind]
+            if with_ids:
+                result["ids"] = [record[id_column] for record in to_records(dataframe[[id_column]].iloc[positions])]
+            if columns:
+                result["rows"] = to_records(dataframe[columns].iloc[positions])
+        results.append(result)
+
+    return {
+        "version": dataset.version,
+        "n_rows": len(dataframe),
+        "results": results
+    }
@@ -1,88 +1,385 @@
 import config
+import coalesce
 import json
 import dash
+import threading
+import flask
 import dash_bootstrap_components as dbc
 import urllib.parse
-import plotly.express as px
-import numpy as np
-import pandas as pd
-pd.options.mode.chained_assignment = None  # default='warn' Set to None because of False Positive warning for the current use case.
 
 from math import ceil, floor
 from dash.dependencies import Input
 from dash.dependencies import Output
 from dash.dependencies import State
 from dash.dependencies import ALL, MATCH
-from dash import dcc
+from dash.dependencies import ClientsideFunction
+from dash.exceptions import PreventUpdate
+from plotly.utils import PlotlyJSONEncoder
 
-from read import read
 from layout import create_new_dropdown_div
 from layout import create_layout
-from layout import create_filter_table
+from layout import create_loading_layout
+from layout import create_page_shell
+from views import decode_view_query
+from views import view_filter_state
+from table import table_page
+from stats import features
+from filters import active_filters
+from filters import column_values
+from filters import encode_filter_query
+from filters import decode_filter_query
+from dataset import DatasetRegistry
+from dataset import IMPORT_LOCK
+from dataset import IMPORTED
+from metrics import instrument
+from compressed import CompressedBody
+
+def create_app():
+    """
+    Returns Dash app with per-callback metrics
+    """
+    #external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
+    external_stylesheets = [dbc.themes.COSMO, dbc.icons.BOOTSTRAP]
+
+    # callbacks refer to components of the full layout, which replaces the loading skeleton
+    # callback responses are compressed (Flask-Compress)
+    app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True, compress=True, meta_tags=[
+        {"name": "viewport", "content": "width=device-width, initial-scale=1"}
+    ])
+
+    # Per-callback timing and payload metrics on /metrics
+    instrument(app)
+    return app
 
-def callback_func(dataframe):
+#################### Helper Functions ####################
 
-    # Drop rows having all attributes: null
-    dataframe.dropna(axis=0, how="all", inplace=True)
+#1) Dataset of a page
+def dataset_name(pathname):
+    """Returns name of the dataset served under a URL path (/<name>), the default dataset for /."""
+    return (pathname or "/").strip("/").split("/")[0] or config.DEFAULT_DATASET
 
-    # Get app layout
-    app.layout = create_layout(dataframe)
+#2) Filter slider of a feature
+def filter_slider_props(dataset, feature, bounds=None):
+    """Returns min, max, value, step and histogram of the slider of a feature, the full range when bounds is None."""
+    stats = dataset.stats
+    min_val, max_val = stats[feature]["min"], stats[feature]["max"]
+    slider_value = [min_val, max_val] if bounds is None else list(bounds)
+
+    is_int = stats[feature]["is_int"]
+
+    if is_int:
+        # if selected feature is integer type then update slider step value
+        step_val = 1
+
+    if not is_int:
+        step_val = 0.000001 # selected values from trial and error to overcome rounding issues
+        slider_value[-1] = ceil(slider_value[-1] * 100000) / 100000 #round up to 5 decimal places
+        slider_value[0] = floor(slider_value[0] * 100000) / 100000 #round down to 5 decimal places
+
+    # value label, live row counts and histogram are drawn in the browser while the slider is dragged (assets/filters.js)
+    histogram = None if stats[feature]["histogram"] is None else dict(
+        stats[feature]["histogram"],
+        nulls=stats[feature]["null_count"],
+        is_int=is_int
+    )
+
+    return {
+        "min": min_val,
+        "max": max_val,
+        "value": slider_value,
+        "step": step_val,
+        "histogram": histogram
+    }
+
+#3) Filter rows of a filter state
+def create_filter_rows(dataset, filter_state):
+    """Returns filter row per filter state entry, each dropdown offering the features not selected by the other filters."""
+    all_features = features(dataset.stats)
+    selected = {item["feature"] for item in filter_state}
+    rows = []
+    for item in filter_state:
+        feature = item["feature"]
+        dropdown_menue = [feat for feat in all_features if feat == feature or feat not in selected]
+        slider_props = None if feature is None else filter_slider_props(dataset, feature, item["bounds"])
+        rows.append(create_new_dropdown_div(item["id"], dropdown_menue, feature, slider_props))
+    return rows
+
+def callback_func(app, registry):
+
+    def current_dataset(pathname):
+        """Returns the loaded Dataset of the page, skipping the callback while it loads."""
+        loader = registry.loader(dataset_name(pathname))
+        dataset = None if loader is None else loader.get()
+        if dataset is None:
+            raise PreventUpdate
+        return dataset
+
+    def request_loader():
+        """Returns loader of the dataset named by the ?dataset= request argument, aborting with 404 for unknown names."""
+        loader = registry.loader(flask.request.args.get("dataset", config.DEFAULT_DATASET))
+        if loader is None:
+            flask.abort(404)
+        return loader
+
+    # Get app layout, a light skeleton filled in with the page of the dataset named by the URL path
+    app.layout = create_page_shell
+
+    def page_key(name, dataset):
+        """Returns key of the page of a dataset version."""
+        return f"{name}@{dataset.version}"
+
+    def dataset_page(name, dataset):
+        """Returns page layout of the dataset, built once per dataset version."""
+        key = ("page", name, tuple(registry.names()))
+        if key not in dataset.layouts:
+            dataset.layouts[key] = create_layout(
+                dataset.dataframe,
+                dataset.stats,
+                config.DATASETS[name].get("axes"),
+                registry.names(),
+                name
+            )
+        return dataset.layouts[key]
+
+    def compressed_page(name, dataset):
+        """Returns skeleton with the page of the dataset, serialized and compressed once per dataset version."""
+        key = ("page", name, tuple(registry.names()))
+        if key not in dataset.pages:
+            page = create_page_shell(dataset_page(name, dataset), page_key(name, dataset))
+            dataset.pages[key] = CompressedBody(json.dumps(page, cls=PlotlyJSONEncoder).encode())
+        return dataset.pages[key]
+
+    # the skeleton does not change, it is serialized and compressed once and revalidated by ETag
+    page_shell = CompressedBody(json.dumps(create_page_shell(), cls=PlotlyJSONEncoder).encode())
+
+    @app.server.before_request
+    def serve_page_shell():
+        if flask.request.path != app.config.routes_pathname_prefix + "_dash-layout":
+            return None
+
+        # the layout is fetched by the page, its URL (the referrer) names the dataset
+        page = urllib.parse.urlsplit(flask.request.referrer or "")
+        loader = registry.loader(dataset_name(page.path))
+        dataset = None if loader is None else loader.get()
+        # loaded datasets are served with their page, linked views (?x=...) and loading pages with the skeleton
+        body = page_shell if dataset is None or page.query else compressed_page(dataset_name(page.path), dataset)
+
+        response = body.response()
+        response.headers["Vary"] = "Accept-Encoding, Referer"
+        return response
+
+    # Session id of the browser tab, used to coalesce its stale requests
+    app.clientside_callback(
+        """
+        function(pathname, session_id) {
+            if (session_id) {
+                return window.dash_clientside.no_update;
+            }
+            return Date.now().toString(36) + Math.random().toString(36).slice(2);
+        }
+        """,
+        Output("session-id", "data"),
+
+        Input("url", "pathname"),
+
+        State("session-id", "data"),
+    )
+
+    # plotly's JSON encoder checks for pandas, callback responses wait while a loader thread imports it (/ready, /metrics and the API do not)
+    @app.server.before_request
+    def wait_for_imports():
+        if flask.request.path == app.config.routes_pathname_prefix + "_dash-update-component":
+            with IMPORT_LOCK:
+                pass
+
+    ############################################
+    ############### 0)Readiness ################
+    ############################################
+
+    # Show the page of the dataset named by the URL path once it is loaded
+    @app.callback(
+        Output("page-content", "children"),
+        Output("loading-interval", "disabled"),
+        Output("page-key", "data"),
+
+        Input("url", "pathname"),
+        Input("loading-interval", "n_intervals"),
+
+        State("url", "search"),
+        State("page-key", "data"),
+    )
+    def show_dataset_layout(pathname, n_intervals, search, shown_key):
+        name = dataset_name(pathname)
+        loader = registry.loader(name)
+        if loader is None:
+            return create_loading_layout(f"Unknown dataset: {name}"), True, None
+
+        dataset = loader.get()
+        if dataset is None:
+            if loader.error is not None:
+                return create_loading_layout(f"Dataset failed to load: {name}"), True, None
+            if not IMPORTED.is_set():
+                # the skeleton already shows the loading message, nothing is serialized while pandas is imported
+                raise PreventUpdate
+            # keep polling until the dataset is loaded
+            return create_loading_layout(), False, None
+
+        axes = config.DATASETS[name].get("axes")
+        if search:
+            # linked view, axes and filters from the URL query
+            try:
+                xaxis, yaxis, add_filter_features, selected_bounds = decode_view_query(search, dataset.stats, axes)
+            except ValueError:
+                xaxis, yaxis, add_filter_features, selected_bounds = decode_view_query("", dataset.stats, axes)
+            filter_state = view_filter_state(add_filter_features, selected_bounds)
+            return create_layout(
+                dataset.dataframe,
+                dataset.stats,
+                (xaxis, yaxis),
+                registry.names(),
+                name,
+                create_filter_rows(dataset, filter_state),
+                filter_state
+            ), True, None
+
+        # the page came with the layout (served precompressed), it is not sent again
+        key = page_key(name, dataset)
+        if shown_key == key:
+            raise PreventUpdate
+        return dataset_page(name, dataset), True, key
+
+    # Navigate to the page of the selected dataset (without the view query of the previous one)
+    @app.callback(
+        Output("url", "href"),
+
+        Input("dataset-selector", "value"),
+
+        State("url", "pathname"),
+        prevent_initial_call=True
+    )
+    def select_dataset(name, pathname):
+        if name is None or name == dataset_name(pathname):
+            raise PreventUpdate
+        return f"/{name}"
+
+    # Keep the view state (axes and filters) in the URL, replacing the history entry so dragging does not add one per step
+    app.clientside_callback(
+        """
+        function(xaxis, yaxis, filter_state) {
+            var params = new URLSearchParams();
+            params.append("x", xaxis);
+            params.append("y", yaxis);
+            (filter_state || []).forEach(function(item) {
+                if (item.feature !== null && item.bounds !== null) {
+                    params.append("feature", item.feature);
+                    params.append("lb", item.bounds[0]);
+                    params.append("ub", item.bounds[1]);
+                }
+            });
+            window.history.replaceState(window.history.state, "", window.location.pathname + "?" + params.toString());
+            return window.dash_clientside.no_update;
+        }
+        """,
+        Output("url", "search"),
+
+        Input("xaxis-column", "value"),
+        Input("yaxis-column", "value"),
+        Input("filter-state", "data"),
+    )
+
+    @app.server.route("/ready")
+    def ready():
+        status = request_loader().status()
+        return flask.jsonify(status), 200 if status["ready"] else 503
+
+    # Memory of every loaded dataset
+    @app.server.route("/datasets")
+    def datasets():
+        return flask.jsonify({
+            "hosted": registry.names(),
+            "loaded": registry.status(),
+            "max_bytes": registry.max_bytes
+        })
+
+    # Re-ingest the dataset and swap the new version in, requests keep being served from the current one
+    @app.server.route("/refresh", methods=["POST"])
+    def refresh():
+        name = flask.request.args.get("dataset", config.DEFAULT_DATASET)
+        loader = request_loader()
+        threading.Thread(target=loader.refresh, args=(config.DATASETS[name].get("url"),), name="dataset-refresh", daemon=True).start()
+        return flask.jsonify({"version": loader.status()["version"]}), 202
 
     ############################################
     ############## 1)Scatter Plot ##############
     ############################################
 
-    #Update scatter plot
+    #1.1) Update scatter plot data: coordinates once per axis selection, packed category codes per filter change
     @app.callback(
-        Output("indicator-graphic", "figure"),
+        Output("scatter-points", "data"),
+        Output("scatter-codes", "data"),
+        Output("scatter-key", "data"),
 
         Input("xaxis-column", "value"),
         Input("yaxis-column", "value"),
-        Input({"type": "filter-slider", "index": ALL}, "value"),
+        Input("filter-state", "data"),
+        Input("indicator-graphic", "relayoutData"),
 
-        State({"type": "filter-dropdown", "index": ALL}, "value"),
+        State("url", "pathname"),
+        State("session-id", "data"),
+        State("scatter-key", "data"),
     )
-    def update_scatter_plot(xaxis_column_name, yaxis_column_name, filter_slider, filter_dropdown):
-
-        # List all selected features
-        add_filter_features = list(filter(lambda val: val!=None, filter_dropdown))
-        # List all choosen filter bounds
-        selected_bounds = np.array(filter_slider).reshape(-1, 2)
-
-        # get filter dataframe and indices of unsatisfied data points
-        filtered_df, unsatisfied_indices = create_filter_table(
-            dataframe,
-            add_filter_features,
-            selected_bounds
-        )
+    def update_scatter_plot(xaxis_column_name, yaxis_column_name, filter_state, relayout_data, pathname, session_id, points_key):
+        # plotly graph objects are imported on first use
+        from figure import render_mode
+        from figure import visible_range
+        from figure import create_scatter_figure
+
+        dataset = current_dataset(pathname)
+        dataframe = dataset.dataframe
+        ctx = dash.callback_context # determining which input has fired (https://dash.plotly.com/advanced-callbacks)
+        density = render_mode(len(dataframe)) == "density"
+
+        # zooming only needs a new figure when points are binned on the server
+        triggered_ids = [trigger["prop_id"].split(".")[0] for trigger in ctx.triggered]
+        if triggered_ids == ["indicator-graphic"] and not density:
+            raise PreventUpdate
+
+        # while a slider is dragged only the latest request of the session builds a figure
+        ticket = coalesce.begin(session_id, "update_scatter_plot")
+
+        # category code per row (satisfies, does not satisfy, unknown) and scatter plot data of the view, shared with the table callback
+        add_filter_features, selected_bounds = active_filters(filter_state)
+        view = dataset.view_result(xaxis_column_name, yaxis_column_name, add_filter_features, selected_bounds)
+        coalesce.check(ticket)
+
+        # coordinates held by the browser are identified by dataset, version and axes
+        key = f"{dataset_name(pathname)}|{dataset.version}|{xaxis_column_name}|{yaxis_column_name}"
+
+        if density:
+            figure = view["scatter"]
+            if visible_range(relayout_data, "xaxis") or visible_range(relayout_data, "yaxis"):
+                # binned on the server for the zoomed ranges
+                figure = create_scatter_figure(
+                    column_values(dataframe, xaxis_column_name),
+                    column_values(dataframe, yaxis_column_name),
+                    view["codes"],
+                    xaxis_column_name,
+                    yaxis_column_name,
+                    relayout_data
+                )
+            return {"key": key, "figure": figure}, None, key
+
+        points = dash.no_update if points_key == key else dict(dataset.scatter_points(xaxis_column_name, yaxis_column_name), key=key)
+        return points, {"key": key, "codes": view["scatter"]}, key
+
+    #1.2) Draw scatter plot in the browser (assets/scatter.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace="umami", function_name="scatterFigure"),
+        Output("indicator-graphic", "figure"),
 
-        # Category 1: Satisfies filter, records where all filtered attributes are non-null and meet the filter conditions.
-        # Category 3: Filter status unknown, records where all non-null attributes meet the corresponding filtered condition, and where at least one filtered attribute is null.
-
-        temp_df = filtered_df.copy(deep=True)
-        temp_df["cat"] = temp_df[add_filter_features].isnull().any(axis=1) # check any of the selected features has null value.
-
-        cat1_df = temp_df[temp_df["cat"] != True]
-        cat3_df = temp_df[temp_df["cat"] == True]
-        
-        cat1_df["Category:"] = "Satisfies filter"
-        cat3_df["Category:"] = "Filter status unknown"
-
-        # Category 2: Does not satisfy filter, records where at least one filtred attributes is non-null and does not meet the corresponding filter conditions.
-        cat2_df = dataframe.iloc[unsatisfied_indices].copy(deep=True)
-        cat2_df["Category:"] = "Does not satisfies filter"
-
-        fig = px.scatter(pd.concat([cat1_df,cat2_df,cat3_df]),
-                        x=xaxis_column_name,
-                        y=yaxis_column_name,
-                        color_discrete_map={
-                            "Satisfies filter": "#636EFA",
-                            "Filter status unknown": "#00CC96",
-                            "Does not satisfies filter":"#EF553B"
-                        },
-                        color="Category:"
-                    )
-        return fig
+        Input("scatter-points", "data"),
+        Input("scatter-codes", "data"),
+    )
 
     ############################################
     ################# 2)Filter #################
@@ -91,124 +388,144 @@ def callback_func(dataframe):
     #2.1) Publish default filter on add click event and remove filter on remove click event
     @app.callback(
         Output("dropdown-container", "children"),
+        Output("filter-next-id", "data"),
 
         [Input("add-filter", "n_clicks"),
         Input({"type":"remove-filter", "index":ALL}, "n_clicks")],
 
-        [State("dropdown-container", "children")],
+        [State("filter-state", "data"),
+        State("filter-next-id", "data"),
+        State("url", "pathname")],
         prevent_initial_call=True
     )
-    def display_dropdown(add_clicks, remove_clicks, div_children):
+    def display_dropdown(add_clicks, remove_clicks, filter_state, next_id, pathname):
+        dataset = current_dataset(pathname)
         ctx = dash.callback_context # determining which input has fired (https://dash.plotly.com/advanced-callbacks)
 
         # extract fired input name
-        triggered_id = ctx.triggered[0]["prop_id"].split(".")[0]
+        trigger = ctx.triggered[0]
+        triggered_id = trigger["prop_id"].split(".")[0]
 
         if triggered_id == "add-filter":
-            # publish new dropdown
-            elm_in_div = len(div_children)
-            dropdown_menue = dataframe.columns[2:]
-            if elm_in_div>0:
-                values = []
-                for i in range(elm_in_div):
-                    value = div_children[i]["props"]["children"][2]["props"]["value"]
-                    values.append(value)
-
-                # dropdown menue do not contain features that are previously selected
-                dropdown_menue = [val for val in dropdown_menue if not val in values]
-
-            # add new dropdown
-            new_div_child = create_new_dropdown_div(add_clicks, dropdown_menue)
-            div_children.append(new_div_child)
-
-        elif triggered_id != "add-filter":
-            # remove filter
-            for idx, val in enumerate(remove_clicks):
-                if val is not None:
-                    #print(f"All the remove buttons: {remove_clicks}")
-                    #print(f"The index pertaining to the remove button clicked: {idx}")
-                    #print(f"The number of time this particualr remove button was clicked: {val}")
-                    del div_children[idx]
-
-        return div_children
-
-    #2.2) Update filter sliders
+            # publish new dropdown, filter ids come from a counter so they are never reused
+            filter_state = filter_state + [{"id": next_id, "feature": None, "bounds": None}]
+            next_id += 1
+
+        else:
+            # remove buttons re-rendered with the filter rows fire without a click
+            if trigger["value"] is None:
+                raise PreventUpdate
+            # remove the filter whose button was clicked
+            removed_id = json.loads(triggered_id)["index"]
+            filter_state = [item for item in filter_state if item["id"] != removed_id]
+
+        return create_filter_rows(dataset, filter_state), next_id
+
+    #2.2) Keep filter state in sync with the filter rows (in the browser, no round trip)
+    app.clientside_callback(
+        """
+        function(filter_slider, filter_dropdown, filter_state) {
+            var sliders = window.dash_clientside.callback_context.inputs_list[0];
+            var state = sliders.map(function(slider, ind) {
+                var feature = filter_dropdown[ind] === undefined ? null : filter_dropdown[ind];
+                // bounds rounded outwards to 5 decimal places, integer bounds are unchanged
+                var bounds = feature === null ? null : [
+                    Math.floor(filter_slider[ind][0] * 100000) / 100000,
+                    Math.ceil(filter_slider[ind][1] * 100000) / 100000
+                ];
+                return {id: slider.id.index, feature: feature, bounds: bounds};
+            });
+            if (JSON.stringify(state) === JSON.stringify(filter_state)) {
+                return window.dash_clientside.no_update;
+            }
+            return state;
+        }
+        """,
+        Output("filter-state", "data"),
+
+        Input({"type": "filter-slider", "index": ALL}, "value"),
+
+        State({"type": "filter-dropdown", "index": ALL}, "value"),
+        State("filter-state", "data"),
+    )
+
+    #2.3) Update filter slider range when a feature is selected
     @app.callback(
         Output({"type":"filter-slider", "index": MATCH}, "min"),
         Output({"type":"filter-slider", "index": MATCH}, "max"),
         Output({"type":"filter-slider", "index": MATCH}, "value"),
         Output({"type":"filter-slider", "index": MATCH}, "step"),
-        Output({"type":"filter-output-container", "index": MATCH}, "children"),
+        Output({"type":"filter-histogram-data", "index": MATCH}, "data"),
 
         Input({"type":"filter-dropdown", "index": MATCH}, "value"),
-        Input({"type":"filter-slider", "index": MATCH}, "value"),
 
-        State({"type":"filter-slider", "index": MATCH}, "min"),
-        State({"type":"filter-slider", "index": MATCH}, "max"),
-        State({"type":"filter-slider", "index": MATCH}, "value"),
+        State("url", "pathname"),
         prevent_initial_call=True
     )
-    def update_filter_slider(column, filter_slider, default_min, default_max, default_value):
-        ctx = dash.callback_context # determining which input has fired (https://dash.plotly.com/advanced-callbacks)
+    def update_filter_slider(column, pathname):
+        # filter without a feature has no range yet
+        if column is None:
+            raise PreventUpdate
+        dataset = current_dataset(pathname)
 
-        # extract fired input name
-        ctx_triggered = ctx.triggered
-        json_triggered = json.loads(ctx_triggered[0]["prop_id"].split(".value")[0])
-        trigger_input_type = json_triggered["type"]        
+        # publish minimum and maximum bounds of the selected feature
+        slider = filter_slider_props(dataset, column)
 
-        if trigger_input_type=="filter-dropdown":
-            # if new feature is selected then publish minimum and maximum bounds
-            min_val, max_val = dataframe[column].min(), dataframe[column].max()
-            slider_value = [min_val, max_val]
+        return slider["min"], slider["max"], slider["value"], slider["step"], slider["histogram"]
 
-        else:
-            # if feature is already selected then keep bounds unchanged
-            min_val, max_val = default_min, default_max
-            # change slider values
-            slider_value = filter_slider
-
-        is_int = all(val.is_integer() for val in dataframe[column].dropna(axis=0))
-
-        if is_int:
-            # if selected feature is integer type then update slider step value
-            step_val = 1
-            # display integer values
-            slider_value_display = list(map(int, slider_value))
-
-        if not is_int:
-            step_val = 0.000001 # selected values from trial and error to overcome rounding issues
-            slider_value[-1] = ceil(slider_value[-1] * 100000) / 100000 #round up to 5 decimal places
-            slider_value[0] = floor(slider_value[0] * 100000) / 100000 #round down to 5 decimal places
-            slider_value_display = slider_value
+    #2.4) Slider value label, live row counts and histogram of the selected range, in the browser (assets/filters.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace="umami", function_name="filterSlider"),
+        Output({"type":"filter-output-container", "index": MATCH}, "children"),
+        Output({"type":"filter-count-container", "index": MATCH}, "children"),
+        Output({"type":"filter-histogram", "index": MATCH}, "figure"),
 
-        return min_val, max_val, slider_value, step_val, f"{slider_value_display}"
+        Input({"type":"filter-slider", "index": MATCH}, "value"),
+        Input({"type":"filter-histogram-data", "index": MATCH}, "data"),
+    )
 
     ############################################
     ############## 3)Filter table ##############
     ############################################
 
-    #Update table on click event/ slider change
+    #Fill table page on page load and update it on click event/ slider change/ page change/ sort change
     @app.callback(
         Output("table-id", "data"),
         Output("table-id", "style_data_conditional"),
-
-        Input("add-filter", "n_clicks"),
-        Input({"type": "filter-slider", "index": ALL}, "value"),
-
-        State({"type": "filter-dropdown", "index": ALL}, "value"),
-        prevent_initial_call=True
+        Output("table-id", "page_count"),
+        Output("table-id", "page_current"),
+
+        Input("filter-state", "data"),
+        Input("table-id", "page_current"),
+        Input("table-id", "page_size"),
+        Input("table-id", "sort_by"),
+
+        State("xaxis-column", "value"),
+        State("yaxis-column", "value"),
+        State("url", "pathname"),
+        State("session-id", "data"),
     )
-    def apply_filter(add_filter_n_clicks, filter_slider, filter_dropdown):
-
-        add_filter_features = list(filter(lambda val: val!=None, filter_dropdown))
-        selected_bounds = np.array(filter_slider).reshape(-1, 2)
-
-        # received filtered dataframe
-        filtered_df, _ = create_filter_table(
-            dataframe,
-            add_filter_features,
-            selected_bounds
-        )
+    def apply_filter(filter_state, page_current, page_size, sort_by, xaxis_column_name, yaxis_column_name, pathname, session_id):
+        dataset = current_dataset(pathname)
+        # while a slider is dragged only the latest request of the session builds a table page
+        ticket = coalesce.begin(session_id, "apply_filter")
+
+        # category code per row and first table page of the view, shared with the scatter plot callback
+        add_filter_features, selected_bounds = active_filters(filter_state)
+        view = dataset.view_result(xaxis_column_name, yaxis_column_name, add_filter_features, selected_bounds)
+        coalesce.check(ticket)
+
+        if not page_current and not sort_by and page_size == config.TABLE_PAGE_SIZE:
+            page_data, n_pages, page_current = view["table"]
+        else:
+            # only the requested page of the filtered and sorted view is sent
+            page_data, n_pages, page_current = table_page(
+                dataset.dataframe,
+                view["codes"],
+                page_current,
+                page_size,
+                sort_by
+            )
 
         # update style data condition for sample display table (rows containing missing values in the selected features are highlighted in the sample display table)
         style_data_condition = [
@@ -221,32 +538,105 @@ def callback_func(dataframe):
                     } for col in add_filter_features
         ]
 
-        return filtered_df.to_dict("records"), style_data_condition
+        return page_data, style_data_condition, n_pages, page_current
 
     #############################################
     ############# 4)Download button #############
     #############################################
 
+    #4.1) Keep export links in sync with the filter state
     @app.callback(
-        Output("download-dataframe-csv", "data"),
+        Output("btn_csv", "href"),
+        Output("btn_parquet", "href"),
 
-        Input("btn_csv", "n_clicks"),
+        Input("filter-state", "data"),
 
-        State("table-id", "data"),
-        prevent_initial_call=True,
+        State("url", "pathname"),
     )
-    def download_button(n_clicks, data):
-        return dcc.send_data_frame(pd.DataFrame(data).to_csv, "data.csv")
+    def update_download_links(filter_state, pathname):
+        query = urllib.parse.urlencode({"dataset": dataset_name(pathname)})
+        filter_query = encode_filter_query(*active_filters(filter_state))
+        if filter_query:
+            query += "&" + filter_query
+        return f"/export/data.csv?{query}", f"/export/data.parquet?{query}"
+
+    #4.2) Stream the filtered rows regenerated from the filter state
+    @app.server.route("/export/data.<fmt>")
+    def export_data(fmt):
+        # pandas serialization is imported on first use
+        from export import EXPORT_FORMATS
+
+        if fmt not in EXPORT_FORMATS:
+            flask.abort(404)
+        dataset = request_loader().get()
+        if dataset is None:
+            return "Dataset is loading", 503
+        try:
+            add_filter_features, bounds = decode_filter_query(flask.request.args)
+        except ValueError as error:
+            return str(error), 400
+        unknown = {feat for feat in add_filter_features if feat not in dataset.stats}
+        if unknown:
+            return f"Unknown features: {sorted(unknown)}", 400
+
+        codes = dataset.evaluate_filters(add_filter_features, bounds)
+        iter_export, mimetype = EXPORT_FORMATS[fmt]
+        try:
+            body = iter_export(dataset.dataframe, codes)
+        except ImportError:
+            return "Parquet export requires pyarrow", 501
+
+        return flask.Response(
+            flask.stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=data.{fmt}"}
+        )
 
-    # Change debug mode
-    app.run_server(debug=True)
+    #############################################
+    ################ 5)Filter API ###############
+    #############################################
 
-if __name__ == "__main__":
-    #external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
-    external_stylesheets = [dbc.themes.COSMO, dbc.icons.BOOTSTRAP]
+    # Batch of filter sets in, per-category counts (optionally ids and projected rows) out, for screening jobs
+    @app.server.route("/api/filter", methods=["POST"])
+    def filter_api():
+        # pandas records are imported on first use
+        from api import run_batch
+
+        body = flask.request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return flask.jsonify({"error": "Request body must be a JSON object"}), 400
+        loader = registry.loader(body.get("dataset", config.DEFAULT_DATASET))
+        if loader is None:
+            return flask.jsonify({"error": "Unknown dataset"}), 404
+        dataset = loader.get()
+        if dataset is None:
+            return flask.jsonify({"error": "Dataset is loading"}), 503
+
+        try:
+            return flask.jsonify(run_batch(dataset, body))
+        except ValueError as error:
+            return flask.jsonify({"error": str(error)}), 400
 
-    app = dash.Dash("__main__", external_stylesheets=external_stylesheets, meta_tags=[
-        {"name": "viewport", "content": "width=device-width, initial-scale=1"}
-    ])
+    #############################################
+    ############### 6)Cache stats ###############
+    #############################################
+
+    # Cache hit/miss counts for sizing MASK_CACHE_BYTES, RESULT_CACHE_BYTES, FIGURE_CACHE_BYTES and VIEW_CACHE_BYTES
+    @app.server.route("/cache-stats")
+    def cache_stats():
+        dataset = request_loader().get()
+        if dataset is None:
+            return flask.jsonify({}), 503
+        return flask.jsonify(dataset.cache_info())
 
-    callback_func(dataframe = read(config.SCHEMA_FILE, config.DATA_FILE))
\ No newline at end of file
+if __name__ == "__main__":
+    app = create_app()
+    # server binds right away, datasets load in the background on first use
+    registry = DatasetRegistry(config.DATASETS, config.DATASET_MEMORY_BYTES)
+    callback_func(app, registry)
+    # new dataset versions are swapped in without a restart
+    registry.start_refreshers()
+    registry.loader(config.DEFAULT_DATASET)
+
+    # Change debug mode (development server, use serve.py in production)
+    app.run_server(debug=True)
@@ -0,0 +1,101 @@
+// Filter slider value label, live row counts and histogram, drawn in the browser while the slider is dragged.
+// Counts come from the prefix sums of the feature histogram: two lookups per range, no request to the server.
+
+(function() {
+    var IN_RANGE = "#636EFA";
+    var OUT_OF_RANGE = "#D3D3D3";
+
+    function emptyFigure() {
+        return {data: [], layout: {height: 50, xaxis: {visible: false}, yaxis: {visible: false}}};
+    }
+
+    // [rows below value, exact], linear within the bin containing value
+    function rowsBelow(histogram, value) {
+        var edges = histogram.edges;
+        var cumulative = histogram.cumulative;
+        var bins = edges.length - 1;
+        if (value <= edges[0]) {
+            return [0, true];
+        }
+        if (value >= edges[bins]) {
+            return [cumulative[bins], true];
+        }
+        // bins have equal width, the bin of a value is found in constant time
+        var bin = Math.min(bins - 1, Math.floor((value - edges[0]) / (edges[bins] - edges[0]) * bins));
+        while (bin > 0 && value < edges[bin]) {
+            bin--;
+        }
+        while (bin < bins - 1 && value >= edges[bin + 1]) {
+            bin++;
+        }
+        var fraction = (value - edges[bin]) / (edges[bin + 1] - edges[bin]);
+        return [cumulative[bin] + fraction * (cumulative[bin + 1] - cumulative[bin]), fraction === 0];
+    }
+
+    function valueLabel(value, isInt) {
+        var bounds = isInt ? value.map(Math.trunc) : [
+            Math.floor(value[0] * 100000) / 100000,
+            Math.ceil(value[1] * 100000) / 100000
+        ];
+        return "[" + bounds.join(", ") + "]";
+    }
+
+    function filterSlider(value, histogram) {
+        if (!value) {
+            return [window.dash_clientside.no_update, window.dash_clientside.no_update, window.dash_clientside.no_update];
+        }
+        if (!histogram) {
+            return ["[" + value.join(", ") + "]", "", emptyFigure()];
+        }
+
+        var edges = histogram.edges;
+        var cumulative = histogram.cumulative;
+        var bins = edges.length - 1;
+
+        // integer values are inside the range when lb <= value <= ub
+        var lo = histogram.is_int ? Math.ceil(value[0]) - 0.5 : value[0];
+        var hi = histogram.is_int ? Math.floor(value[1]) + 0.5 : value[1];
+        var below_lo = rowsBelow(histogram, lo);
+        var below_hi = rowsBelow(histogram, hi);
+        var satisfies = hi < lo ? 0 : Math.round(below_hi[0] - below_lo[0]);
+        var fails = cumulative[bins] - satisfies;
+        // estimated when a bound falls inside a bin
+        var prefix = below_lo[1] && below_hi[1] ? "" : "~";
+        var counts = prefix + satisfies + " match, " + prefix + fails + " fail, " + histogram.nulls + " unknown";
+
+        var centers = [];
+        var heights = [];
+        var colors = [];
+        for (var bin = 0; bin < bins; bin++) {
+            centers.push((edges[bin] + edges[bin + 1]) / 2);
+            heights.push(cumulative[bin + 1] - cumulative[bin]);
+            colors.push(edges[bin + 1] > lo && edges[bin] < hi ? IN_RANGE : OUT_OF_RANGE);
+        }
+
+        var figure = {
+            data: [{
+                type: "bar",
+                x: centers,
+                y: heights,
+                marker: {color: colors},
+                hoverinfo: "skip"
+            }],
+            layout: {
+                height: 50,
+                margin: {l: 0, r: 0, t: 0, b: 0},
+                bargap: 0.1,
+                showlegend: false,
+                xaxis: {visible: false, range: [edges[0], edges[bins]]},
+                yaxis: {visible: false}
+            }
+        };
+
+        return [valueLabel(value, histogram.is_int), counts, figure];
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        umami: Object.assign({}, (window.dash_clientside || {}).umami, {
+            filterSlider: filterSlider
+        })
+    });
+})();
@@ -0,0 +1,77 @@
+// Scatter plot drawn in the browser: the coordinates arrive once per axis selection,
+// every filter change only sends the category code per row packed 4 rows per byte.
+
+(function() {
+    // decoded coordinates of the last axis selection
+    var decoded = {key: null, x: null, y: null};
+
+    function bytes(text) {
+        var binary = atob(text);
+        var array = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            array[i] = binary.charCodeAt(i);
+        }
+        return array;
+    }
+
+    function coordinates(points) {
+        if (decoded.key !== points.key) {
+            decoded = {
+                key: points.key,
+                x: new Float64Array(bytes(points.x).buffer),
+                y: new Float64Array(bytes(points.y).buffer)
+            };
+        }
+        return decoded;
+    }
+
+    function scatterFigure(points, codes) {
+        if (!points) {
+            return window.dash_clientside.no_update;
+        }
+        // density mode, binned on the server
+        if (points.figure) {
+            return points.figure;
+        }
+        // codes of another axis selection or dataset version, wait for the matching ones
+        if (!codes || codes.key !== points.key) {
+            return window.dash_clientside.no_update;
+        }
+
+        var xy = coordinates(points);
+        var packed = bytes(codes.codes);
+        var n = points.n;
+        var ncat = points.traces.length;
+
+        // rows per category code (2 bits per row, first row in the high bits)
+        var code = new Uint8Array(n);
+        var counts = new Array(ncat).fill(0);
+        for (var i = 0; i < n; i++) {
+            code[i] = (packed[i >> 2] >> (6 - 2 * (i & 3))) & 3;
+            counts[code[i]]++;
+        }
+
+        var xs = counts.map(function(count) { return new Float64Array(count); });
+        var ys = counts.map(function(count) { return new Float64Array(count); });
+        var filled = new Array(ncat).fill(0);
+        for (var j = 0; j < n; j++) {
+            var c = code[j];
+            xs[c][filled[c]] = xy.x[j];
+            ys[c][filled[c]] = xy.y[j];
+            filled[c]++;
+        }
+
+        return {
+            data: points.traces.map(function(trace, c) {
+                return Object.assign({}, trace, {x: xs[c], y: ys[c]});
+            }),
+            layout: points.layout
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        umami: Object.assign({}, (window.dash_clientside || {}).umami, {
+            scatterFigure: scatterFigure
+        })
+    });
+})();
@@ -0,0 +1,220 @@
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+import synthetic
+from read import read
+from stats import compute_stats
+from stats import features
+from filters import categorize
+from figure import create_scatter_figure
+from figure import pack_codes
+from filters import column_values
+from index import load_indexes
+from table import table_page
+
+ROW_COUNTS = [2000, 100000, 1000000, 10000000]
+FILTER_COUNTS = [1, 5, 10, 20]
+# Thread pool sizes of the parallel filter engine
+THREAD_COUNTS = [2, 4, 8]
+# Relative latency increase over the baseline reported as a regression
+TOLERANCE = 0.25
+
+#################### Helper Functions ####################
+
+#1) Measure a stage
+def measure(func, repeat):
+    """Returns (median latency in ms, peak traced memory in bytes, result) of func."""
+    latencies = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # separate run, tracing slows the measured code down
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return float(np.median(latencies)), peak, result
+
+#2) Serialized size of a callback response
+def payload_bytes(obj):
+    """Returns bytes of obj serialized the way Dash sends it."""
+    return len(json.dumps(obj, cls=PlotlyJSONEncoder).encode())
+
+#3) Filter bounds hitting about half of each column
+def filter_bounds(stats, filter_features):
+    """Returns [lb, ub] bounds between the 25% and 75% quantiles of each feature (n x 2 array)."""
+    return np.array([
+        [stats[feat]["quantiles"][1], stats[feat]["quantiles"][3]]
+        for feat in filter_features
+    ]).reshape(-1, 2)
+
+#4) Selective filter bounds
+def selective_bounds(stats, filter_features):
+    """Returns [lb, ub] bounds from the 5% quantile to the maximum of each feature (n x 2 array), few rows fail."""
+    return np.array([
+        [stats[feat]["quantiles"][0], stats[feat]["max"]]
+        for feat in filter_features
+    ]).reshape(-1, 2)
+
+#5) Benchmark one dataset size
+def bench_rows(n_rows, filter_counts, repeat, thread_counts=()):
+    """Returns benchmark records of every stage for a synthetic dataset of n_rows rows."""
+    records = []
+
+    def record(stage, result, n_filters=0, payload=None):
+        latency_ms, peak, _ = result
+        records.append({
+            "rows": n_rows,
+            "stage": stage,
+            "filters": n_filters,
+            "latency_ms": latency_ms,
+            "peak_bytes": peak,
+            "payload_bytes": payload
+        })
+        print(f"{n_rows:>10} {stage:<10} {n_filters:>3} {latency_ms:>12.2f} ms {peak:>14} B {payload if payload is not None else '':>12}")
+
+    store_dir = tempfile.mkdtemp(prefix="umami-bench-")
+    try:
+        synthetic.write_store(store_dir, n_rows)
+
+        # 1) Loader (memory map) and first full touch of every column
+        record("read", measure(lambda: read(store_dir), repeat))
+        dataframe = read(store_dir)
+        record("touch", measure(lambda: [column_values(dataframe, col) for col in dataframe.columns[2:]], 1))
+
+        # 2) Statistics catalog, what update_filter_slider reads
+        result = measure(lambda: compute_stats(dataframe), 1)
+        record("stats", result)
+        stats = result[2]
+        feature_names = features(stats)
+        x_name, y_name = feature_names[1], feature_names[2]
+
+        # 3) Sorted column indexes, built once per store
+        result = measure(lambda: load_indexes(dataframe, feature_names), 1)
+        record("index", result)
+        indexes = result[2]
+
+        for n_filters in filter_counts:
+            filter_features = [feature_names[ind % len(feature_names)] for ind in range(n_filters)]
+            bounds = filter_bounds(stats, filter_features)
+
+            # 4) Filter engine, shared by update_scatter_plot and apply_filter
+            result = measure(lambda: categorize(dataframe, filter_features, bounds), repeat)
+            record("filter", result, n_filters)
+            codes = result[2]
+            serial_ms = result[0]
+
+            # 4.1) Parallel filter engine, row chunks on a thread pool (same codes as the serial engine)
+            for threads in thread_counts:
+                with ThreadPoolExecutor(threads) as pool:
+                    result = measure(lambda: categorize(dataframe, filter_features, bounds, pool=pool), repeat)
+                record(f"filter-t{threads}", result, n_filters)
+                print(f"{'':>10} speedup x{serial_ms / result[0]:.2f} with {threads} threads")
+
+            # 5) Live match counts next to each slider, by binary search
+            result = measure(lambda: [indexes[feat].counts(lb, ub) for feat, (lb, ub) in zip(filter_features, bounds)], repeat)
+            record("counts", result, n_filters)
+
+            # 6) Selective filters (few failing rows) by column scan and by index
+            narrow = selective_bounds(stats, filter_features)
+            record("filter-sel", measure(lambda: categorize(dataframe, filter_features, narrow), repeat), n_filters)
+            record("filter-idx", measure(lambda: categorize(dataframe, filter_features, narrow, indexes=indexes), repeat), n_filters)
+
+            # 7) update_scatter_plot figure
+            x_values, y_values = column_values(dataframe, x_name), column_values(dataframe, y_name)
+            result = measure(lambda: create_scatter_figure(x_values, y_values, codes, x_name, y_name), repeat)
+            record("scatter", result, n_filters, payload_bytes(result[2]))
+
+            # 7.1) update_scatter_plot per filter change, packed category codes (coordinates are cached in the browser)
+            result = measure(lambda: {"codes": pack_codes(codes)}, repeat)
+            record("scatter-codes", result, n_filters, payload_bytes(result[2]))
+
+            # 8) apply_filter table page, sorted by one column
+            sort_by = [{"column_id": x_name, "direction": "asc"}]
+            result = measure(lambda: table_page(dataframe, codes, 0, 10, sort_by), repeat)
+            record("table", result, n_filters, payload_bytes(result[2][0]))
+
+        del dataframe
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    return records
+
+#6) Compare with baseline
+def compare(results, baseline, tolerance):
+    """Returns (key, baseline ms, current ms) of every stage slower than the baseline by more than tolerance."""
+    def key(record):
+        return (record["rows"], record["stage"], record["filters"])
+
+    baseline_latency = {key(record): record["latency_ms"] for record in baseline["results"]}
+    regressions = []
+    for record in results["results"]:
+        previous = baseline_latency.get(key(record))
+        if previous is not None and record["latency_ms"] > previous * (1 + tolerance):
+            regressions.append((key(record), previous, record["latency_ms"]))
+    return regressions
+
+#################### Benchmark suite ####################
+
+def run(row_counts, filter_counts, repeat, thread_counts=()):
+    """
+    Returns benchmark results of loader, statistics, column indexes, filter engine, scatter figure and table page for every dataset size
+    """
+    records = []
+    for n_rows in row_counts:
+        records += bench_rows(n_rows, filter_counts, repeat, thread_counts)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count()
+        },
+        "results": records
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loader, filter engine and callback stages on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=ROW_COUNTS)
+    parser.add_argument("--filters", type=int, nargs="+", default=FILTER_COUNTS)
+    parser.add_argument("--threads", type=int, nargs="*", default=THREAD_COUNTS, help="thread pool sizes of the parallel filter stages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="../benchmarks/results.json")
+    parser.add_argument("--baseline", default="../benchmarks/baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.filters, args.repeat, args.threads)
+
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for (n_rows, stage, n_filters), previous, current in regressions:
+            print(f"Regression: {stage} rows={n_rows} filters={n_filters} {previous:.2f} ms -> {current:.2f} ms")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,138 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+#################### Helper Functions ####################
+
+#1) Size of a cached value
+def value_bytes(value):
+    """Returns bytes held by numpy arrays, strings and numbers (8 bytes each) of a value, also inside tuples, lists and dict values."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(value_bytes(val) for val in value)
+    if isinstance(value, dict):
+        return sum(value_bytes(val) for val in value.values())
+    if isinstance(value, (int, float)):
+        return 8
+    return 0
+
+#2) Result of an in-flight computation
+class Pending:
+    """Result of a computation other threads can wait for."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def set(self, value=None, error=None):
+        """Publishes the result and wakes up waiting threads."""
+        self.value = value
+        self.error = error
+        self.event.set()
+
+    def result(self):
+        """Waits for the result, raising the error of a failed computation."""
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+#################### LRU cache ####################
+
+class LRUCache:
+    """
+    Thread safe memory bounded LRU cache of numpy arrays with hit/miss counters, entries optionally expire ttl_seconds after they were stored
+    """
+
+    def __init__(self, max_bytes, ttl_seconds=None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # misses served by a computation already in flight
+        self.shared = 0
+        self.expired = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Returns cached value of key, computing and storing it on a miss. Concurrent misses of the same key wait for a single computation."""
+        with self.lock:
+            if key in self.entries and self.is_expired(self.entries[key]):
+                self.bytes -= self.entries.pop(key)[1]
+                self.expired += 1
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+
+            pending = self.pending.get(key)
+            owner = pending is None
+            if owner:
+                self.misses += 1
+                pending = self.pending[key] = Pending()
+            else:
+                self.shared += 1
+
+        if not owner:
+            return pending.result()
+
+        try:
+            value = compute()
+        except BaseException as error:
+            pending.set(error=error)
+            raise
+        else:
+            self.put(key, value)
+            pending.set(value=value)
+            return value
+        finally:
+            with self.lock:
+                del self.pending[key]
+
+    def put(self, key, value):
+        """Stores value and evicts least recently used entries above the memory budget."""
+        size = value_bytes(value)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size, time.monotonic())
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def is_expired(self, entry):
+        """Returns True if the entry (value, size, time stored) outlived the time to live."""
+        return self.ttl_seconds is not None and time.monotonic() - entry[2] > self.ttl_seconds
+
+    def clear(self):
+        """Removes every entry."""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def info(self):
+        """Returns hit/miss counts and memory use."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "expired": self.expired,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes
+            }
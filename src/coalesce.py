@@ -0,0 +1,77 @@
+import time
+import threading
+from collections import OrderedDict
+
+from dash.exceptions import PreventUpdate
+
+import config
+from metrics import METRICS
+
+# (session, output) keys remembered, least recently used ones are dropped
+MAX_KEYS = 10000
+
+#################### Request coalescing ####################
+
+class Coalescer:
+    """
+    Latest request wins per (session, output): older requests still waiting or running for the same output return early, and expensive outputs run at most once per minimum interval
+    """
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        # key -> [sequence number of the latest request, start time of the last run]
+        self.keys = OrderedDict()
+
+    def begin(self, session, output, min_interval_ms=0):
+        """
+        Registers a request for output of session and returns its ticket. Waits until min_interval_ms passed since the last run of the output, raises PreventUpdate if a newer request arrived meanwhile
+        """
+        key = (session, output)
+        with self.lock:
+            state = self.keys.setdefault(key, [0, 0.0])
+            self.keys.move_to_end(key)
+            while len(self.keys) > self.max_keys:
+                self.keys.popitem(last=False)
+            state[0] += 1
+            ticket = (key, state[0])
+            wait = state[1] + min_interval_ms / 1000 - time.monotonic()
+
+        if wait > 0:
+            # trailing edge, the last request of a drag always runs
+            time.sleep(wait)
+
+        with self.lock:
+            self.check(ticket)
+            state[1] = time.monotonic()
+        return ticket
+
+    def stale(self, ticket):
+        """Returns True if a newer request for the same output arrived."""
+        key, sequence = ticket
+        state = self.keys.get(key)
+        return state is not None and state[0] != sequence
+
+    def check(self, ticket):
+        """Raises PreventUpdate (the request returns early) if the request was superseded."""
+        if self.stale(ticket):
+            METRICS.supersede(ticket[0][1])
+            raise PreventUpdate
+
+COALESCER = Coalescer()
+
+#################### Helper Functions ####################
+
+#1) Start a coalesced callback
+def begin(session, output):
+    """Returns ticket of a request for an expensive output, waiting for its configured minimum interval."""
+    if session is None:
+        # no session id, every request runs
+        return None
+    return COALESCER.begin(session, output, config.MIN_INTERVAL_MS.get(output, 0))
+
+#2) Checkpoint of a coalesced callback
+def check(ticket):
+    """Raises PreventUpdate if a newer request superseded this one."""
+    if ticket is not None:
+        COALESCER.check(ticket)
@@ -0,0 +1,55 @@
+import gzip
+import hashlib
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    # gzip only
+    brotli = None
+
+#################### Precompressed responses ####################
+
+class CompressedBody:
+    """
+    Response body encoded once (identity, gzip and brotli when available) with a strong ETag per encoding, served to every request after content negotiation
+    """
+
+    def __init__(self, body, mimetype="application/json"):
+        self.mimetype = mimetype
+        self.sha = hashlib.sha1(body).hexdigest()
+        self.encodings = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.encodings["br"] = brotli.compress(body)
+
+    def nbytes(self):
+        """Returns memory of the encoded bodies in bytes."""
+        return sum(len(body) for body in self.encodings.values())
+
+    def encoding(self, accept_encoding):
+        """Returns smallest encoding the client accepts."""
+        accepted = {item.split(";")[0].strip() for item in accept_encoding.split(",")}
+        candidates = [name for name in self.encodings if name == "identity" or name in accepted]
+        return min(candidates, key=lambda name: len(self.encodings[name]))
+
+    def etag(self, encoding):
+        """Returns ETag of the body in the given encoding, the encoded bytes differ so the tags do too."""
+        return self.sha if encoding == "identity" else f"{self.sha}-{encoding}"
+
+    def response(self):
+        """Returns response for the current request, 304 when the client copy of the negotiated encoding is current."""
+        encoding = self.encoding(flask.request.headers.get("Accept-Encoding", ""))
+        etag = self.etag(encoding)
+        if etag in flask.request.if_none_match:
+            response = flask.Response(status=304)
+        else:
+            response = flask.Response(self.encodings[encoding], mimetype=self.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        # cached by the browser, revalidated on every page load
+        response.headers["Cache-Control"] = "no-cache"
+        return response
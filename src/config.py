@@ -1,3 +1,78 @@
+import os
+
 URL = "https://odin.cse.buffalo.edu/umami.json"
-SCHEMA_FILE = "../input/schema.pkl"
-DATA_FILE = "../input/data.pkl"
+STORE_DIR = "../input/store"
+
+# Hosted datasets {name: {"url": source, "store": columnar store directory, "axes": optional default scatter axes, "views": optional saved views}}, each served under /<name>.
+# Saved views are page URL queries ("?x=...&y=...&feature=...&lb=...&ub=..."), computed into the view cache whenever a dataset version is loaded
+DATASETS = {
+    "umami": {"url": URL, "store": STORE_DIR, "axes": ("ABS_wf_D", "STAT_CC_D"), "views": []}
+}
+# Dataset served under /
+DEFAULT_DATASET = "umami"
+# Memory budget of the loaded datasets in bytes, least recently used datasets are unloaded above it
+DATASET_MEMORY_BYTES = 4 * 1024 * 1024 * 1024
+# Dataset versions kept in the store, older ones are removed after a refresh
+KEEP_VERSIONS = 2
+
+# Seconds between background re-ingestions of URL, None disables scheduled refresh (POST /refresh still works)
+REFRESH_SECONDS = None
+# Seconds between checks for a new dataset version published by another process
+RELOAD_CHECK_SECONDS = 10
+
+# dtype of float features in the columnar store ("float32" halves memory at reduced precision)
+FLOAT_DTYPE = "float64"
+
+# Memory budget of the per-predicate filter mask cache in bytes
+MASK_CACHE_BYTES = 256 * 1024 * 1024
+
+# Sorted per-column indexes (selective range predicates and filter API counts by binary search), built once and kept with the store.
+# Off by default: they take 12 bytes per value (about 4 GB for 10M rows x 37 features), counted toward DATASET_MEMORY_BYTES, and the first load sorts every column
+COLUMN_INDEXES = False
+
+# Threads evaluating filters in parallel (1 evaluates serially, None uses every core), with several serve.py workers keep workers x threads near the core count
+FILTER_THREADS = 1
+# Rows per parallel task, larger tables are split into row chunks, smaller ones run one predicate per thread
+FILTER_CHUNK_ROWS = 1 << 20
+
+# Minimum milliseconds between two runs of an expensive output per browser session, requests arriving meanwhile are coalesced into the latest one (slider labels stay live)
+MIN_INTERVAL_MS = {
+    "update_scatter_plot": 100,
+    "apply_filter": 100
+}
+
+# Filter API (/api/filter): filter sets per request, rows returned per filter set, and (rows x filter sets) cells evaluated per row chunk
+API_MAX_QUERIES = 10000
+API_ROW_LIMIT = 1000
+BATCH_CHUNK_CELLS = 1 << 22
+
+# Memory budget of the category codes cached per filter state in bytes
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Memory budget of the scatter plot coordinates encoded per axis selection in bytes
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Memory budget and time to live (seconds, None keeps entries until evicted) of the view results (category codes, scatter plot codes or density figure, first table page) cached per view state
+VIEW_CACHE_BYTES = 64 * 1024 * 1024
+VIEW_CACHE_SECONDS = 24 * 60 * 60
+# Rows per page of the sample table
+TABLE_PAGE_SIZE = 10
+
+# Scatter plot rows above which points are drawn with WebGL, and above which 2D binned density is sent instead of points
+WEBGL_THRESHOLD = 5000
+DENSITY_THRESHOLD = 500000
+# Bins per axis of the density mode
+DENSITY_BINS = 100
+
+# Histogram bins per feature shown under each filter slider, range counts while dragging come from their prefix sums
+HISTOGRAM_BINS = 40
+
+# Dump a flame graph (collapsed stacks) of callback requests slower than this many milliseconds, None disables the sampling profiler
+PROFILE_SLOW_MS = None
+PROFILE_INTERVAL_MS = 5
+PROFILE_DIR = "../profiles"
+
+# Production server (serve.py)
+HOST = "0.0.0.0"
+PORT = 8050
+WORKERS = os.cpu_count() or 1
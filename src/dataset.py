@@ -0,0 +1,365 @@
+import time
+import threading
+from collections import OrderedDict
+
+import config
+from cache import LRUCache
+from filters import categorize
+from filters import filter_key
+from filters import filter_pool
+from filters import column_values
+from metrics import record_filter
+
+# Held while a loader thread imports pandas, a response serialized meanwhile would see the partially initialized module
+IMPORT_LOCK = threading.Lock()
+# Set once pandas is imported
+IMPORTED = threading.Event()
+
+#################### Dataset ####################
+
+class Dataset:
+    """
+    Loaded dataset with its statistics catalog and derived caches, all keyed by the dataset version
+    """
+
+    def __init__(self, dataframe):
+        # Dataset version keys every derived cache
+        self.version = dataframe.attrs.get("version")
+
+        # store directory the columns are memory mapped from
+        directory = dataframe.attrs.get("directory")
+
+        # Drop rows having all attributes: null (the memory mapped columns are only copied if such rows exist)
+        all_null = dataframe.isnull().all(axis=1).to_numpy()
+        if all_null.any():
+            dataframe = dataframe[~all_null].reset_index(drop=True)
+            # row positions of stored indexes no longer match
+            directory = None
+        self.dataframe = dataframe
+
+        # statistics and index modules import numpy only, imported here to keep app start light
+        from stats import compute_stats
+        from stats import features
+        from index import load_indexes
+
+        # Column statistics catalog used by sliders, dropdowns and layout
+        self.stats = compute_stats(dataframe)
+
+        # Sorted index per feature, range predicates and match counts by binary search
+        self.indexes = load_indexes(dataframe, features(self.stats), directory) if config.COLUMN_INDEXES else {}
+
+        # Per-predicate filter masks, only predicates whose bounds changed are evaluated again
+        self.mask_cache = LRUCache(config.MASK_CACHE_BYTES)
+
+        # Category codes per filter state, shared by the scatter plot, table and download callbacks
+        self.result_cache = LRUCache(config.RESULT_CACHE_BYTES)
+
+        # Encoded scatter plot coordinates per axis selection, sent to the browser once and kept there
+        self.figure_cache = LRUCache(config.FIGURE_CACHE_BYTES)
+
+        # Results per view state (axes and filters) shared by the page callbacks, linked views load without recomputation
+        self.view_cache = LRUCache(config.VIEW_CACHE_BYTES, config.VIEW_CACHE_SECONDS)
+
+        # Page layouts of this dataset version, built on first request
+        self.layouts = {}
+
+        # Serialized pages (skeleton with the page layout) of this dataset version, compressed once and revalidated by ETag on every page load
+        self.pages = {}
+
+    def evaluate_filters(self, add_filter_features, selected_bounds):
+        """Returns category code per row of the active filters, evaluated once per filter state."""
+
+        def compute():
+            # only evaluations count toward filter time and rows touched, cache hits touch no rows
+            start = time.perf_counter()
+            codes = categorize(
+                self.dataframe,
+                add_filter_features,
+                selected_bounds,
+                self.mask_cache,
+                self.version,
+                self.indexes,
+                filter_pool()
+            )
+            record_filter(time.perf_counter() - start, len(codes))
+            return codes
+
+        return self.result_cache.get((self.version, filter_key(add_filter_features, selected_bounds)), compute)
+
+    def scatter_points(self, xaxis_column_name, yaxis_column_name):
+        """Returns encoded scatter plot coordinates and figure template of an axis selection, encoded once per dataset version."""
+        from figure import scatter_points
+
+        return self.figure_cache.get(
+            (xaxis_column_name, yaxis_column_name),
+            lambda: scatter_points(
+                column_values(self.dataframe, xaxis_column_name),
+                column_values(self.dataframe, yaxis_column_name),
+                xaxis_column_name,
+                yaxis_column_name
+            )
+        )
+
+    def view_result(self, xaxis_column_name, yaxis_column_name, add_filter_features, selected_bounds):
+        """
+        Returns category codes, scatter plot data (packed codes, or the density figure of the full range) and first table page (records, page count, page index) of a view, computed once per view state
+        """
+        # plotly and pandas records are imported on first use
+        from figure import render_mode
+        from figure import pack_codes
+        from figure import create_scatter_figure
+        from table import table_page
+        from views import view_key
+
+        def compute():
+            codes = self.evaluate_filters(add_filter_features, selected_bounds)
+            if render_mode(len(codes)) == "density":
+                scatter = create_scatter_figure(
+                    column_values(self.dataframe, xaxis_column_name),
+                    column_values(self.dataframe, yaxis_column_name),
+                    codes,
+                    xaxis_column_name,
+                    yaxis_column_name
+                ).to_plotly_json()
+            else:
+                scatter = pack_codes(codes)
+            return {
+                "codes": codes,
+                "scatter": scatter,
+                "table": table_page(self.dataframe, codes, 0, config.TABLE_PAGE_SIZE, [])
+            }
+
+        key = view_key(xaxis_column_name, yaxis_column_name, add_filter_features, selected_bounds)
+        return self.view_cache.get((self.version, key), compute)
+
+    def warm_views(self, queries, axes=None):
+        """Computes the results of saved views (page URL queries) into the view cache, skipping malformed ones."""
+        from views import decode_view_query
+
+        warmed = 0
+        for query in queries:
+            try:
+                xaxis, yaxis, add_filter_features, selected_bounds = decode_view_query(query, self.stats, axes)
+            except ValueError as error:
+                print("Saved view skipped:", query, repr(error))
+                continue
+            self.view_result(xaxis, yaxis, add_filter_features, selected_bounds)
+            self.scatter_points(xaxis, yaxis)
+            warmed += 1
+        if warmed:
+            print("Saved views warmed:", warmed)
+
+    def nbytes(self):
+        """Returns memory of the columns, indexes and derived caches in bytes."""
+        return (
+            int(self.dataframe.memory_usage(index=False).sum())
+            + sum(index.nbytes() for index in self.indexes.values())
+            + self.mask_cache.info()["bytes"]
+            + self.result_cache.info()["bytes"]
+            + self.figure_cache.info()["bytes"]
+            + self.view_cache.info()["bytes"]
+            + sum(page.nbytes() for page in self.pages.values())
+        )
+
+    def cache_info(self):
+        """Returns hit/miss counts of the derived caches."""
+        return {
+            "masks": self.mask_cache.info(),
+            "results": self.result_cache.info(),
+            "figures": self.figure_cache.info(),
+            "views": self.view_cache.info()
+        }
+
+#################### Dataset loader ####################
+
+class DatasetLoader:
+    """
+    Builds the Dataset on a background thread so the server can accept requests while it loads, and swaps in new dataset versions without a restart
+    """
+
+    def __init__(self, store_dir, views=(), axes=None):
+        self.store_dir = store_dir
+        # saved views computed into the view cache of every loaded version
+        self.views = list(views)
+        self.axes = axes
+        self.dataset = None
+        self.error = None
+        self.started = time.time()
+        self.ready = threading.Event()
+        # set when the dataset is unloaded, stops the refresher
+        self.stopped = threading.Event()
+        # one refresh at a time per process
+        self.refresh_lock = threading.Lock()
+
+    def load(self):
+        """Reads the store and builds the Dataset in the calling thread."""
+        try:
+            # pandas is imported on first load, not at app start
+            with IMPORT_LOCK:
+                from read import read
+            IMPORTED.set()
+            dataset = Dataset(read(self.store_dir))
+            dataset.warm_views(self.views, self.axes)
+            self.dataset = dataset
+        except Exception as error:
+            self.error = error
+            raise
+        finally:
+            self.ready.set()
+
+    def start(self):
+        """Loads the Dataset on a daemon thread."""
+        threading.Thread(target=self.load, name="dataset-loader", daemon=True).start()
+        return self
+
+    def get(self):
+        """Returns the loaded Dataset, None while loading."""
+        return self.dataset
+
+    def nbytes(self):
+        """Returns memory of the loaded Dataset in bytes, 0 while loading."""
+        dataset = self.dataset
+        return 0 if dataset is None else dataset.nbytes()
+
+    def unload(self):
+        """Drops the Dataset and stops the refresher, requests holding it finish on it."""
+        self.stopped.set()
+        self.dataset = None
+
+    def reload(self):
+        """
+        Builds a Dataset of the current store version off to the side and swaps it in, returns True if the version changed. Requests holding the previous Dataset finish on it, its caches go with it
+        """
+        from read import read
+        from store import read_meta
+        from store import current_dir
+
+        version = read_meta(current_dir(self.store_dir)).get("version")
+        if self.dataset is not None and version == self.dataset.version:
+            return False
+
+        dataset = Dataset(read(self.store_dir))
+        # saved views load from cache as soon as the new version is served
+        dataset.warm_views(self.views, self.axes)
+        # single reference assignment, callbacks see either the old or the new snapshot
+        self.dataset = dataset
+        self.error = None
+        print("Dataset version:", dataset.version)
+        return True
+
+    def refresh(self, url=None):
+        """Ingests url (if given) into a new store version and reloads, returns True if a new version was loaded."""
+        if not self.refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if url is not None:
+                # requests is only needed when refreshing from the source
+                from get import ingest
+                ingest(url, self.store_dir)
+            return self.reload()
+        except Exception as error:
+            print("Refresh failed:", repr(error))
+            return False
+        finally:
+            self.refresh_lock.release()
+
+    def start_refresher(self, url=None, refresh_seconds=None, check_seconds=None):
+        """
+        Re-ingests url every refresh_seconds (None disables) and picks up versions published by other processes every check_seconds on a daemon thread
+        """
+        refresh_seconds = config.REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        check_seconds = config.RELOAD_CHECK_SECONDS if check_seconds is None else check_seconds
+
+        def loop():
+            self.ready.wait()
+            next_ingest = time.time() + refresh_seconds if refresh_seconds else None
+            while not self.stopped.wait(min(check_seconds, refresh_seconds or check_seconds)):
+                if next_ingest is not None and time.time() >= next_ingest:
+                    next_ingest = time.time() + refresh_seconds
+                    self.refresh(url)
+                else:
+                    self.refresh()
+
+        threading.Thread(target=loop, name="dataset-refresher", daemon=True).start()
+        return self
+
+    def status(self):
+        """Returns readiness status for the /ready endpoint."""
+        return {
+            "ready": self.dataset is not None,
+            "version": None if self.dataset is None else self.dataset.version,
+            "error": None if self.error is None else repr(self.error),
+            "seconds": round(time.time() - self.started, 3)
+        }
+
+#################### Dataset registry ####################
+
+class DatasetRegistry:
+    """
+    Hosted datasets loaded on first use, least recently used ones are unloaded when the loaded datasets exceed the memory budget
+    """
+
+    def __init__(self, datasets, max_bytes):
+        self.datasets = datasets
+        self.max_bytes = max_bytes
+        # loaders in least to most recently used order
+        self.loaders = OrderedDict()
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def names(self):
+        """Returns names of the hosted datasets."""
+        return list(self.datasets)
+
+    def loader(self, name, background=True):
+        """Returns loader of a hosted dataset, loading it on first use (on a daemon thread when background), None for unknown names."""
+        if name not in self.datasets:
+            return None
+        with self.lock:
+            loader = self.loaders.get(name)
+            created = loader is None
+            if created:
+                dataset = self.datasets[name]
+                loader = DatasetLoader(dataset["store"], dataset.get("views", ()), dataset.get("axes"))
+                self.loaders[name] = loader
+            self.loaders.move_to_end(name)
+
+        if created:
+            if background:
+                loader.start()
+            else:
+                loader.load()
+            if self.refreshing:
+                loader.start_refresher(self.datasets[name].get("url"))
+        self.evict()
+        return loader
+
+    def evict(self):
+        """Unloads least recently used datasets until the loaded ones fit the memory budget, the most recently used one is always kept."""
+        with self.lock:
+            names = list(self.loaders)
+            resident = sum(loader.nbytes() for loader in self.loaders.values())
+            for name in names[:-1]:
+                if resident <= self.max_bytes:
+                    break
+                loader = self.loaders.pop(name)
+                resident -= loader.nbytes()
+                loader.unload()
+                print("Dataset unloaded:", name)
+
+    def start_refreshers(self):
+        """Starts loading and refreshing of every loaded dataset in this process (threads do not survive fork), and of datasets loaded later."""
+        with self.lock:
+            self.refreshing = True
+            loaders = list(self.loaders.items())
+        for name, loader in loaders:
+            if not loader.ready.is_set():
+                loader.start()
+            loader.start_refresher(self.datasets[name].get("url"))
+        return self
+
+    def status(self):
+        """Returns status of every loaded dataset."""
+        with self.lock:
+            loaders = list(self.loaders.items())
+        return {name: dict(loader.status(), bytes=loader.nbytes()) for name, loader in loaders}
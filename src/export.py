@@ -0,0 +1,68 @@
+import tempfile
+
+from table import filtered_positions
+
+# Rows serialized at a time, bounds export memory
+EXPORT_CHUNK_ROWS = 50000
+# Bytes read at a time when streaming a spooled file
+FILE_CHUNK = 1 << 16
+
+#################### Helper Functions ####################
+
+#1) Filtered rows in chunks
+def iter_chunks(dataframe, codes, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields dataframe chunks of the rows that are not excluded by the filters."""
+    positions = filtered_positions(codes)
+    for start in range(0, len(positions), chunk_rows):
+        yield dataframe.iloc[positions[start:start + chunk_rows]]
+
+#2) Stream a file
+def iter_file(file):
+    """Yields file contents in chunks and closes the file."""
+    with file:
+        file.seek(0)
+        while True:
+            data = file.read(FILE_CHUNK)
+            if not data:
+                return
+            yield data
+
+#################### Export formats ####################
+
+#1) CSV
+def iter_csv(dataframe, codes):
+    """
+    Yields CSV text of the filtered rows chunk by chunk
+    """
+    yield dataframe.head(0).to_csv(index=False)
+    for chunk in iter_chunks(dataframe, codes):
+        yield chunk.to_csv(header=False, index=False)
+
+#2) Parquet
+def iter_parquet(dataframe, codes):
+    """
+    Yields Parquet bytes of the filtered rows, written one row group per chunk to a temporary file (requires pyarrow)
+    """
+    # optional dependency, only needed for Parquet export
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file = tempfile.TemporaryFile()
+    writer = None
+    for chunk in iter_chunks(dataframe, codes):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(file, table.schema)
+        writer.write_table(table)
+
+    if writer is None:
+        # no rows, write the schema only
+        writer = pq.ParquetWriter(file, pa.Schema.from_pandas(dataframe.head(0), preserve_index=False))
+    writer.close()
+
+    return iter_file(file)
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "parquet": (iter_parquet, "application/vnd.apache.parquet")
+}
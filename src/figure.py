@@ -0,0 +1,172 @@
+import base64
+
+import numpy as np
+import plotly.graph_objects as go
+
+import config
+from filters import CATEGORY_NAMES
+
+CATEGORY_COLORS = {
+    "Satisfies filter": "#636EFA",
+    "Filter status unknown": "#00CC96",
+    "Does not satisfies filter":"#EF553B"
+}
+
+#################### Helper Functions ####################
+
+#1) Rendering mode
+def render_mode(n_rows):
+    """Returns "svg", "webgl" or "density" depending on number of plotted rows."""
+    if n_rows <= config.WEBGL_THRESHOLD:
+        return "svg"
+    if n_rows <= config.DENSITY_THRESHOLD:
+        return "webgl"
+    return "density"
+
+#2) Visible axis ranges from relayout data
+def visible_range(relayout_data, axis):
+    """Returns [min, max] of a zoomed axis, None when the axis is autoscaled."""
+    if not relayout_data or relayout_data.get(f"{axis}.autorange"):
+        return None
+    if f"{axis}.range[0]" in relayout_data:
+        return [relayout_data[f"{axis}.range[0]"], relayout_data[f"{axis}.range[1]"]]
+    if f"{axis}.range" in relayout_data:
+        return list(relayout_data[f"{axis}.range"])
+    return None
+
+#3) Full axis range
+def value_range(values):
+    """Returns [min, max] of non-null values, [0, 1] when all are null."""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return [0.0, 1.0]
+    min_val, max_val = float(values.min()), float(values.max())
+    if min_val == max_val:
+        # constant column, widen so bins have non-zero width
+        return [min_val - 0.5, max_val + 0.5]
+    return [min_val, max_val]
+
+#4) Point traces
+def point_traces(x_values, y_values, codes, trace_type):
+    """Returns one scatter trace per category with every point."""
+    return [
+        trace_type(
+            x=x_values[codes == code],
+            y=y_values[codes == code],
+            mode="markers",
+            name=name,
+            legendgroup=name,
+            marker={"color": CATEGORY_COLORS[name]}
+        )
+        for code, name in enumerate(CATEGORY_NAMES)
+    ]
+
+#5) Binned density traces
+def density_traces(x_values, y_values, codes, x_range, y_range, bins):
+    """Returns one WebGL trace per category with a marker per occupied 2D bin, sized by its count."""
+    # drop points with a null coordinate once for every category
+    valid = ~(np.isnan(x_values) | np.isnan(y_values))
+    x_values, y_values, codes = x_values[valid], y_values[valid], codes[valid]
+
+    x_edges = np.linspace(x_range[0], x_range[1], bins + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], bins + 1)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+
+    traces = []
+    for code, name in enumerate(CATEGORY_NAMES):
+        selected = codes == code
+        counts, _, _ = np.histogram2d(
+            x_values[selected],
+            y_values[selected],
+            bins=[x_edges, y_edges]
+        )
+        x_ind, y_ind = np.nonzero(counts)
+        bin_counts = counts[x_ind, y_ind]
+
+        traces.append(go.Scattergl(
+            x=x_centers[x_ind],
+            y=y_centers[y_ind],
+            mode="markers",
+            name=name,
+            legendgroup=name,
+            customdata=bin_counts,
+            hovertemplate="%{x}, %{y}<br>Count: %{customdata}",
+            marker={
+                "color": CATEGORY_COLORS[name],
+                "size": 3 + 2 * np.log2(bin_counts),
+                "opacity": 0.6
+            }
+        ))
+    return traces
+
+#6) Binary array for the client
+def encode_array(values):
+    """Returns base64 text of the little-endian bytes of an array, decoded into a typed array in the browser."""
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+
+#7) Category codes for the client
+def pack_codes(codes):
+    """Returns base64 text of the category codes packed 4 rows per byte (2 bits each, first row in the high bits)."""
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    packed = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+    return encode_array(packed.astype(np.uint8))
+
+#################### Client side scatter figure ####################
+
+def scatter_points(x_values, y_values, xaxis_column_name, yaxis_column_name):
+    """
+    Returns the coordinates (float64, NaN for nulls) and figure template the browser keeps per axis selection, filter changes only send packed category codes and the points are split into category traces on the client (assets/scatter.js)
+    """
+    mode = render_mode(len(x_values))
+    return {
+        "n": len(x_values),
+        "x": encode_array(x_values.astype("<f8")),
+        "y": encode_array(y_values.astype("<f8")),
+        "traces": [
+            {
+                "type": "scatter" if mode == "svg" else "scattergl",
+                "mode": "markers",
+                "name": name,
+                "legendgroup": name,
+                "marker": {"color": CATEGORY_COLORS[name]}
+            }
+            for name in CATEGORY_NAMES
+        ],
+        "layout": {
+            "xaxis": {"title": {"text": xaxis_column_name}},
+            "yaxis": {"title": {"text": yaxis_column_name}},
+            "legend": {"title": {"text": "Category:"}},
+            # keep zoom while filters change
+            "uirevision": f"{xaxis_column_name}|{yaxis_column_name}",
+            "meta": {"mode": mode}
+        }
+    }
+
+#################### Scatter figure ####################
+
+def create_scatter_figure(x_values, y_values, codes, xaxis_column_name, yaxis_column_name, relayout_data=None):
+    """
+    Returns scatter figure of the categorized rows: SVG for small data, WebGL above WEBGL_THRESHOLD and server-side 2D density (rebinned to the zoomed range) above DENSITY_THRESHOLD
+    """
+    mode = render_mode(len(codes))
+
+    if mode == "density":
+        x_range = visible_range(relayout_data, "xaxis") or value_range(x_values)
+        y_range = visible_range(relayout_data, "yaxis") or value_range(y_values)
+        traces = density_traces(x_values, y_values, codes, x_range, y_range, config.DENSITY_BINS)
+    else:
+        traces = point_traces(x_values, y_values, codes, go.Scatter if mode == "svg" else go.Scattergl)
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        xaxis_title=xaxis_column_name,
+        yaxis_title=yaxis_column_name,
+        legend_title_text="Category:",
+        # keep zoom while filters change and bins are recomputed
+        uirevision=f"{xaxis_column_name}|{yaxis_column_name}",
+        meta={"mode": mode}
+    )
+    return fig
@@ -0,0 +1,277 @@
+import os
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+
+#################### Filter categories ####################
+
+# Category codes, one per row (int8)
+# Category 1: Satisfies filter, records where all filtered attributes are non-null and meet the filter conditions.
+# Category 2: Does not satisfy filter, records where at least one filtered attribute is non-null and does not meet the corresponding filter condition.
+# Category 3: Filter status unknown, records where all non-null attributes meet the corresponding filter condition, and where at least one filtered attribute is null.
+SATISFIES = 0
+FAILS = 1
+UNKNOWN = 2
+
+CATEGORY_NAMES = np.array([
+    "Satisfies filter",
+    "Does not satisfies filter",
+    "Filter status unknown"
+])
+
+#################### Helper Functions ####################
+
+#1) Column values as float array
+def column_values(dataframe, feature):
+    """Returns column values as a float64 numpy array with nulls as NaN."""
+    return dataframe[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+
+#2) Masks of a single range predicate
+def predicate_masks(values, lb, ub):
+    """Returns (fail mask, null mask) of the predicate lb <= value <= ub."""
+    null_mask = np.isnan(values)
+    # NaN comparisons are False, so null values never fail a predicate
+    with np.errstate(invalid="ignore"):
+        fail_mask = (values < lb) | (values > ub)
+    return fail_mask, null_mask
+
+#3) Combine predicate masks into category codes
+def combine_masks(n_rows, masks):
+    """Returns int8 category code per row from an iterable of (fail mask, null mask) pairs."""
+    any_fail = np.zeros(n_rows, dtype=bool)
+    any_null = np.zeros(n_rows, dtype=bool)
+    for fail_mask, null_mask in masks:
+        any_fail |= fail_mask
+        any_null |= null_mask
+
+    codes = np.full(n_rows, SATISFIES, dtype=np.int8)
+    codes[any_null] = UNKNOWN
+    codes[any_fail] = FAILS
+    return codes
+
+#4) Row chunks
+def row_chunks(n_rows, chunk_rows):
+    """Returns (start, stop) of consecutive row chunks covering n_rows rows."""
+    return [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+#5) Run chunk tasks
+def run_chunks(pool, func, chunks):
+    """Runs func(start, stop) for every chunk on the pool and waits for all of them, re-raising the first error."""
+    for future in [pool.submit(func, start, stop) for start, stop in chunks]:
+        future.result()
+
+#6) Masks of a single range predicate by row chunks
+def parallel_predicate_masks(series, lb, ub, pool, chunk_rows):
+    """Returns (fail mask, null mask) of the predicate, row chunks are evaluated on the pool (NumPy comparisons release the GIL)."""
+    n_rows = len(series)
+    fail_mask = np.empty(n_rows, dtype=bool)
+    null_mask = np.empty(n_rows, dtype=bool)
+
+    def evaluate(start, stop):
+        # every chunk writes its own slice, the result does not depend on scheduling
+        values = series.iloc[start:stop].to_numpy(dtype=np.float64, na_value=np.nan)
+        fail_mask[start:stop], null_mask[start:stop] = predicate_masks(values, lb, ub)
+
+    run_chunks(pool, evaluate, row_chunks(n_rows, chunk_rows))
+    return fail_mask, null_mask
+
+#7) Combine predicate masks into category codes by row chunks
+def parallel_combine_masks(n_rows, masks, pool, chunk_rows):
+    """Returns int8 category code per row, row chunks are combined on the pool in the same feature order as combine_masks."""
+    masks = list(masks)
+    codes = np.empty(n_rows, dtype=np.int8)
+
+    def combine(start, stop):
+        codes[start:stop] = combine_masks(stop - start, ((fail[start:stop], null[start:stop]) for fail, null in masks))
+
+    run_chunks(pool, combine, row_chunks(n_rows, chunk_rows))
+    return codes
+
+#8) Masks of a feature predicate
+def feature_masks(dataframe, feature, lb, ub, indexes=None, pool=None, chunk_rows=None):
+    """Returns (fail mask, null mask) of the predicate, from the column index when that is cheaper than scanning the column, scanned by row chunks on the pool for large tables."""
+    index = None if indexes is None else indexes.get(feature)
+    if index is not None and index.selective(lb, ub):
+        return index.masks(lb, ub)
+    chunk_rows = chunk_rows or config.FILTER_CHUNK_ROWS
+    if pool is not None and len(dataframe) > chunk_rows:
+        return parallel_predicate_masks(dataframe[feature], lb, ub, pool, chunk_rows)
+    return predicate_masks(column_values(dataframe, feature), lb, ub)
+
+#9) Cached masks of a single range predicate
+def cached_predicate_masks(dataframe, feature, lb, ub, cache, version, indexes=None, pool=None, chunk_rows=None):
+    """Returns (fail mask, null mask) of the predicate from the mask cache, keyed by (dataset version, feature, lb, ub)."""
+    lb, ub = float(lb), float(ub)
+
+    def compute():
+        return feature_masks(dataframe, feature, lb, ub, indexes, pool, chunk_rows)
+
+    fail_mask, null_mask = cache.get((version, feature, lb, ub), compute)
+    return fail_mask, null_mask
+
+#10) Active filters of the filter state
+def active_filters(filter_state):
+    """Returns features of the filter state ([{"id", "feature", "bounds"}, ...]) with a selected feature and their [lb, ub] bounds (n x 2 array)."""
+    selected = [item for item in filter_state or [] if item["feature"] is not None and item["bounds"] is not None]
+    bounds = np.array([item["bounds"] for item in selected], dtype=np.float64).reshape(-1, 2)
+    return [item["feature"] for item in selected], bounds
+
+#11) Canonical filter state
+def filter_key(features, bounds):
+    """Returns hashable canonical form of the filter state."""
+    return tuple((feat, float(lb), float(ub)) for feat, (lb, ub) in zip(features, bounds))
+
+#12) Filter state as URL query
+def encode_filter_query(features, bounds):
+    """Returns URL query string of the filter state (repeated feature/lb/ub parameters)."""
+    params = []
+    for feat, (lb, ub) in zip(features, bounds):
+        params += [("feature", feat), ("lb", repr(float(lb))), ("ub", repr(float(ub)))]
+    return urllib.parse.urlencode(params)
+
+def decode_filter_query(args):
+    """Returns features and [lb, ub] bounds (n x 2 array) from parsed query arguments (a werkzeug MultiDict)."""
+    features, lbs, ubs = args.getlist("feature"), args.getlist("lb"), args.getlist("ub")
+    if not len(features) == len(lbs) == len(ubs):
+        raise ValueError("Every feature needs one lb and one ub")
+    try:
+        bounds = np.column_stack([
+            np.array(lbs, dtype=np.float64),
+            np.array(ubs, dtype=np.float64)
+        ]).reshape(-1, 2)
+    except (TypeError, ValueError):
+        raise ValueError("Filter bounds must be numbers")
+    if np.isnan(bounds).any():
+        raise ValueError("Filter bounds must not be NaN")
+    return features, bounds
+
+#13) Filter set of the filter API
+def decode_filter_set(query):
+    """Returns features and [lb, ub] bounds (n x 2 array) of a {"filters": [{"feature": ..., "lb": ..., "ub": ...}, ...]} filter set, a missing bound is unbounded."""
+    filters = query.get("filters", []) if isinstance(query, dict) else None
+    if not isinstance(filters, list) or not all(isinstance(filt, dict) and isinstance(filt.get("feature"), str) for filt in filters):
+        raise ValueError("A filter set is {\"filters\": [{\"feature\": ..., \"lb\": ..., \"ub\": ...}, ...]} with feature names as strings")
+    features = [filt["feature"] for filt in filters]
+    try:
+        bounds = np.array([
+            [
+                -np.inf if filt.get("lb") is None else float(filt["lb"]),
+                np.inf if filt.get("ub") is None else float(filt["ub"])
+            ]
+            for filt in filters
+        ], dtype=np.float64).reshape(-1, 2)
+    except (TypeError, ValueError):
+        raise ValueError("Filter bounds must be numbers")
+    if np.isnan(bounds).any():
+        raise ValueError("Filter bounds must not be NaN")
+    return features, bounds
+
+#################### Filter engine ####################
+
+# Filter thread pool of this process and the pid it was created in
+POOL = None
+POOL_PID = None
+
+def filter_pool():
+    """Returns thread pool shared by filter evaluations of this process, None when FILTER_THREADS is 1."""
+    global POOL, POOL_PID
+    threads = config.FILTER_THREADS or os.cpu_count() or 1
+    if threads <= 1:
+        return None
+    # threads do not survive fork, every worker process creates its own pool
+    if POOL is None or POOL_PID != os.getpid():
+        POOL = ThreadPoolExecutor(threads, thread_name_prefix="filter")
+        POOL_PID = os.getpid()
+    return POOL
+
+def categorize(dataframe, features, bounds, cache=None, version=None, indexes=None, pool=None, chunk_rows=None):
+    """
+    Returns int8 category code per row (positional) for the given features and their [lb, ub] bounds. With a mask cache only predicates that changed are evaluated, with column indexes selective predicates are answered by binary search. With a thread pool, tables larger than chunk_rows are evaluated by row chunks in parallel and smaller tables one predicate per thread
+    """
+    n_rows = len(dataframe)
+    chunk_rows = chunk_rows or config.FILTER_CHUNK_ROWS
+
+    def masks_of(ind):
+        feat = features[ind]
+        if cache is None:
+            return feature_masks(dataframe, feat, *bounds[ind], indexes, pool, chunk_rows)
+        return cached_predicate_masks(dataframe, feat, *bounds[ind], cache, version, indexes, pool, chunk_rows)
+
+    if pool is None:
+        return combine_masks(n_rows, (masks_of(ind) for ind in range(len(features))))
+
+    if n_rows > chunk_rows:
+        # predicates one after another, each split into row chunks (tasks never wait on other tasks of the pool)
+        masks = [masks_of(ind) for ind in range(len(features))]
+        return parallel_combine_masks(n_rows, masks, pool, chunk_rows)
+
+    # small tables, one task per predicate, merged in feature order
+    masks = list(pool.map(masks_of, range(len(features))))
+    return combine_masks(n_rows, masks)
+
+#################### Batch filter engine ####################
+
+def batch_categorize(dataframe, queries, keep=(), categories=(SATISFIES,), limit=0, chunk_cells=None):
+    """
+    Evaluates a batch of filter sets [(features, bounds), ...] in one pass over row chunks, every column chunk is compared against the bounds of all filter sets at once. Returns (counts, rows): counts is a (filter sets x 3) array of rows per category code, rows {filter set: positions of the first limit rows in the given categories} for the filter sets in keep
+    """
+    n_rows, n_queries = len(dataframe), len(queries)
+    chunk_cells = chunk_cells or config.BATCH_CHUNK_CELLS
+    # a chunk holds two (rows x filter sets) boolean matrices
+    chunk_rows = max(8, chunk_cells // max(n_queries, 1))
+
+    # predicates grouped by (feature, occurrence within the filter set), so the filter sets of a group are distinct
+    groups = {}
+    for qind, (features, bounds) in enumerate(queries):
+        seen = {}
+        for feat, (lb, ub) in zip(features, bounds):
+            occurrence = seen[feat] = seen.get(feat, -1) + 1
+            group = groups.setdefault((feat, occurrence), ([], [], []))
+            group[0].append(qind)
+            group[1].append(lb)
+            group[2].append(ub)
+    groups = [
+        (feat, np.array(qinds), np.array(lbs, dtype=np.float64), np.array(ubs, dtype=np.float64))
+        for (feat, _), (qinds, lbs, ubs) in groups.items()
+    ]
+
+    counts = np.zeros((n_queries, 3), dtype=np.int64)
+    # only the returned positions are kept, a filter set stops collecting once it has limit rows
+    rows = {qind: [] for qind in keep}
+    collecting = {qind: limit for qind in keep if limit > 0}
+
+    for start, stop in row_chunks(n_rows, chunk_rows):
+        any_fail = np.zeros((stop - start, n_queries), dtype=bool)
+        any_null = np.zeros((stop - start, n_queries), dtype=bool)
+        for feat, qinds, lbs, ubs in groups:
+            values = dataframe[feat].iloc[start:stop].to_numpy(dtype=np.float64, na_value=np.nan)[:, None]
+            # NaN comparisons are False, so null values never fail a predicate
+            with np.errstate(invalid="ignore"):
+                any_fail[:, qinds] |= (values < lbs) | (values > ubs)
+            any_null[:, qinds] |= np.isnan(values)
+
+        unknown = any_null & ~any_fail
+        counts[:, FAILS] += any_fail.sum(axis=0)
+        counts[:, UNKNOWN] += unknown.sum(axis=0)
+
+        for qind, missing in list(collecting.items()):
+            wanted = np.zeros(stop - start, dtype=bool)
+            if SATISFIES in categories:
+                wanted |= ~any_fail[:, qind] & ~any_null[:, qind]
+            if FAILS in categories:
+                wanted |= any_fail[:, qind]
+            if UNKNOWN in categories:
+                wanted |= unknown[:, qind]
+            positions = np.flatnonzero(wanted)[:missing] + start
+            rows[qind].append(positions)
+            if len(positions) == missing:
+                del collecting[qind]
+            else:
+                collecting[qind] = missing - len(positions)
+
+    counts[:, SATISFIES] = n_rows - counts[:, FAILS] - counts[:, UNKNOWN]
+    rows = {qind: np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64) for qind, chunks in rows.items()}
+    return counts, rows
@@ -1,30 +1,246 @@
-import requests
+import os
+import re
 import json
-import pickle
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+import requests
 
 import config
+from store import StoreWriter
+from store import read_meta
+from store import current_dir
+from store import publish_version
+from store import prune_versions
+
+# Bytes requested from the response stream at a time
+DOWNLOAD_CHUNK = 1 << 16
+
+WHITESPACE = re.compile(r"\s*")
+
+#################### Streaming JSON parser ####################
+
+class JsonStream:
+    """
+    Incremental parser of the {"schema": [...], "data": [[...], ...]} document, rows are parsed as text arrives
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Appends the next chunk to the unparsed part of the buffer, returns False at end of stream."""
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns next non-whitespace character."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, chars):
+        """Consumes next non-whitespace character, which must be one of chars."""
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Returns next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def events(self):
+        """Yields ("row", row) for every data row and (key, value) for every other top level key."""
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            if key == "data":
+                self.expect("[")
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield "row", self.value()
+                        if self.expect(",]") == "]":
+                            break
+            else:
+                yield key, self.value()
+            if self.expect(",}") == "}":
+                return
+
+#################### Helper Functions ####################
+
+#1) Validators of the stored dataset
+def stored_validators(store_dir):
+    """Returns (ETag, Last-Modified) of the current dataset version, None when missing."""
+    try:
+        meta = read_meta(current_dir(store_dir))
+    except (OSError, ValueError):
+        return None, None
+    return meta.get("etag"), meta.get("last_modified")
+
+#2) Conditional request headers
+def request_headers(etag, last_modified):
+    """Returns headers asking for compressed transfer and skipping unchanged content."""
+    headers = {"Accept-Encoding": "gzip, deflate"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+#3) Write rows into the store
+def write_store(events, store_dir):
+    """Writes streamed rows into a columnar store in fixed size chunks."""
+    writer = None
+    # rows arriving before the schema are spooled to disk to keep memory bounded
+    spool = None
+
+    try:
+        for key, value in events:
+            if key == "row":
+                if writer is not None:
+                    writer.append([value])
+                else:
+                    if spool is None:
+                        spool = tempfile.TemporaryFile("w+")
+                    spool.write(json.dumps(value) + "\n")
+
+            elif key == "schema":
+                writer = StoreWriter(store_dir, value)
+                if spool is not None:
+                    spool.seek(0)
+                    writer.append(json.loads(line) for line in spool)
+                    spool.close()
+                    spool = None
+    except BaseException:
+        # truncated or malformed stream
+        if writer is not None:
+            writer.discard()
+        if spool is not None:
+            spool.close()
+        raise
+
+    if writer is None:
+        raise ValueError("Dataset has no schema")
+    return writer
+
+#4) New version name
+def new_version():
+    """Returns sortable, unique dataset version name."""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+#5) Single ingestion per store
+@contextlib.contextmanager
+def ingest_lock(store_dir):
+    """Yields True when this process holds the ingestion lock of the store, False when another process is ingesting."""
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, ".lock"), "w") as file:
+        try:
+            import fcntl
+        except ImportError:
+            # no advisory locks on this platform
+            yield True
+            return
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+#################### Ingestion ####################
+
+def ingest(url, store_dir, force=False):
+    """
+    Streams the dataset into a new version of the columnar store and publishes it, skipping the download when it is unchanged upstream or another process is ingesting. Returns True if a new version was published
+    """
+    with ingest_lock(store_dir) as acquired:
+        if not acquired:
+            print("Ingestion already running:", store_dir)
+            return False
+
+        etag, last_modified = (None, None) if force else stored_validators(store_dir)
+        r = requests.get(url, headers=request_headers(etag, last_modified), stream=True)
 
-r = requests.get(config.URL)
+        with r:
+            if r.status_code == 304:
+                print("Dataset unchanged:", url)
+                return False
 
-if r.status_code == 200:
-    text = r.text
-    json_obj = json.loads(text)
+            if r.status_code != 200:
+                print("Status Code:", r.status_code)
+                return False
 
-    schema = json_obj["schema"]
-    data = json_obj["data"]
+            # gzip/deflate transfer encoding is decoded while streaming
+            r.encoding = r.encoding or "utf-8"
+            version = new_version()
+            new_dir = os.path.join(store_dir, version + ".tmp")
 
-    for rind, row in enumerate(data):
-        for cind, elem in enumerate(row):
-            if cind>1 and elem!=None:
-                row[cind] = float(elem)
+            stream = JsonStream(r.iter_content(chunk_size=DOWNLOAD_CHUNK, decode_unicode=True))
+            try:
+                writer = write_store(stream.events(), new_dir)
+                writer.close(
+                    version=version,
+                    url=url,
+                    etag=r.headers.get("ETag"),
+                    last_modified=r.headers.get("Last-Modified")
+                )
+            except BaseException:
+                # prune_versions only sees published versions, a failed download is removed here
+                shutil.rmtree(new_dir, ignore_errors=True)
+                raise
 
-        data[rind] = row
+        # readers switch to the new version once it is completely written
+        os.replace(new_dir, os.path.join(store_dir, version))
+        publish_version(store_dir, version)
+        prune_versions(store_dir, config.KEEP_VERSIONS)
 
-    with open(config.SCHEMA_FILE, "wb") as file:
-        pickle.dump(schema, file)
+    print("Rows written:", writer.n_rows)
+    return True
 
-    with open(config.DATA_FILE, "wb") as file:
-        pickle.dump(data, file)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the dataset into the columnar store.")
+    parser.add_argument("--dataset", default=config.DEFAULT_DATASET, choices=list(config.DATASETS))
+    parser.add_argument("--url", help="source URL (default: of the dataset)")
+    parser.add_argument("--store", help="store directory (default: of the dataset)")
+    parser.add_argument("--force", action="store_true", help="download even if unchanged upstream")
+    args = parser.parse_args()
 
-else:
-    print("Status Code:", r.status_code)
\ No newline at end of file
+    dataset = config.DATASETS[args.dataset]
+    ingest(args.url or dataset["url"], args.store or dataset["store"], force=args.force)
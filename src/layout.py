@@ -5,31 +5,13 @@ from dash.dependencies import Output
 #import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 
+import config
+from stats import features
+from stats import default_axes
+
 #################### Helper Functions ####################
 
-#1) Display table after add-filter
-def create_filter_table(dataframe, add_features, bounds):
-    """Returns filtered pandas dataframe."""
-    #dataframe = dataframe.fillna('N/A').replace('', 'N/A')
-
-    # find indices of rows that unsatisfies bounds
-    unsatisfied_indices = set()
-    # Iterate over features to be added
-    for ind, feat in enumerate(add_features):
-        lb, ub = bounds[ind]
-        #print(lb, ub, dataframe[feat].min(), dataframe[feat].max())
-        unsatisfied_indices.update(
-            set(dataframe[(dataframe[feat]<lb) | (dataframe[feat]>ub)].index.tolist())
-        )
-    
-    # dataframe with satified rows
-    new_df = dataframe.iloc[list(
-        set(dataframe.index) - unsatisfied_indices
-    )]
-    #print(len(unsatisfied_indices))
-    return new_df.reset_index(drop=True), list(unsatisfied_indices)
-
-#2) Dropdown menue for scatter plot
+#1) Dropdown menue for scatter plot
 def create_dropdown_div(dropdown_id, features, column, display_name, right_margin="0px"):
     """Return dropdown menue."""
     return html.Div(
@@ -50,7 +32,7 @@ def create_dropdown_div(dropdown_id, features, column, display_name, right_margi
             style = {"display":"flex", "margin-right":right_margin}
         )
 
-#3) Create tooltip
+#2) Create tooltip
 def make_tooltip(text, tooltip_target, placement="top"):
     return dbc.Tooltip(
         text,
@@ -58,9 +40,10 @@ def make_tooltip(text, tooltip_target, placement="top"):
         placement=placement,
     )
 
-#4) Publish new dropdown
-def create_new_dropdown_div(id_index, dropdown_list):
-    """Returns dropdown div with remove button, tooltip for remove button, slider value, and dropdown menue iteself indexed on click event (number of clicks)."""
+#3) Publish new dropdown
+def create_new_dropdown_div(id_index, dropdown_list, feature=None, slider_props=None):
+    """Returns dropdown div with remove button, tooltip for remove button, histogram, slider value, and dropdown menue iteself indexed by filter id, showing feature and slider_props (min, max, value, step, histogram) of an existing filter."""
+    slider_props = slider_props or {"min": -1000, "max": 1000, "value": [-1000, 1000], "step": 0.01, "histogram": None}
 
     # Remove filter button
     button_id = {"type": "remove-filter","index": id_index}
@@ -81,21 +64,41 @@ def create_new_dropdown_div(id_index, dropdown_list):
             "type": "filter-slider",
             "index": id_index
         },
-        min = -1000,
-        max = 1000,
-        step = 0.01,
-        value = [-1000, 1000],
+        min = slider_props["min"],
+        max = slider_props["max"],
+        step = slider_props["step"],
+        value = slider_props["value"],
         updatemode = "drag"
     )
 
-    # Slider div with range slider and slider display values
+    # Histogram of the feature above the slider, the selected range highlighted
+    histogram = dcc.Graph(
+        id = {
+            "type": "filter-histogram",
+            "index": id_index
+        },
+        figure = {"data": [], "layout": {"height": 50, "xaxis": {"visible": False}, "yaxis": {"visible": False}}},
+        config = {"staticPlot": True},
+        style = {"height": "50px"}
+    )
+
+    # Slider div with histogram, range slider and slider display values
     slider_div = html.Div(
         children = [
+            histogram,
+            dcc.Store(id={
+                    "type": "filter-histogram-data",
+                    "index": id_index
+            }, data=slider_props["histogram"]),
             slider,
             html.Div(f"{slider.value}", id={
                     "type": "filter-output-container",
                     "index": id_index
-            }, style={"padding-left": "40px"})
+            }, style={"padding-left": "40px"}),
+            html.Div("", id={
+                    "type": "filter-count-container",
+                    "index": id_index
+            }, style={"padding-left": "40px", "font-size":"small"})
         ],
         style={"width":"180px"}
     )
@@ -107,6 +110,7 @@ def create_new_dropdown_div(id_index, dropdown_list):
                 "index": id_index
             },
             options=[{"label":i, "value":i} for i in dropdown_list],
+            value=feature,
             style={"width":"175px"},
             clearable=False
         )
@@ -136,14 +140,14 @@ def return_header():
     )
 
 #2) Scatter plot
-def return_scatter_plot_div(features):
+def return_scatter_plot_div(features, x_column, y_column):
     """Returns scatter plot div with scatter plot header, dropdown div (x-axis and y-axis dropdown menues), and actual scatter plot via graph object."""
 
     # x dropdown div
     x_dropdown_div = create_dropdown_div(
         dropdown_id = "xaxis-column",
         features = features,
-        column = "ABS_wf_D",
+        column = x_column,
         display_name="X-axis:",
         right_margin="40px"
     )
@@ -152,7 +156,7 @@ def return_scatter_plot_div(features):
     y_dropdown_div = create_dropdown_div(
         dropdown_id = "yaxis-column",
         features = features,
-        column = "STAT_CC_D",
+        column = y_column,
         display_name="Y-axis:"
     )
 
@@ -165,9 +169,14 @@ def return_scatter_plot_div(features):
         style={"display":"inline-flex", "margin-left":"80px"}
     )
 
-    # Scatter plot object
+    # Scatter plot object, drawn in the browser from the coordinates (sent once per axis selection) and the category codes (sent per filter change)
     graph_object = html.Div(
-        children=[dcc.Graph(id='indicator-graphic')]
+        children=[
+            dcc.Graph(id='indicator-graphic'),
+            dcc.Store(id='scatter-points'),
+            dcc.Store(id='scatter-codes'),
+            dcc.Store(id='scatter-key')
+        ]
     )
 
     return html.Div(
@@ -183,14 +192,18 @@ def return_scatter_plot_div(features):
     )
 
 #3) Filter div
-def return_filter_div():
-    """Returns filter div with dropdown container (that can contain multiple filter dropdown divs) and add filter button (with it's tooltip) at the bottom."""
+def return_filter_div(filter_rows=(), filter_state=()):
+    """Returns filter div with dropdown container (that can contain multiple filter dropdown divs, filter_rows rendered from filter_state) and add filter button (with it's tooltip) at the bottom."""
     button_id = "add-filter"
     add_filter_div = html.Div(
         children=[
                 html.Div(
                     children=[
-                        html.Div(id="dropdown-container", children=[])
+                        html.Div(id="dropdown-container", children=list(filter_rows)),
+                        # filter state [{"id", "feature", "bounds"}, ...], the filter rows are rendered from it
+                        dcc.Store(id="filter-state", data=list(filter_state)),
+                        # id of the next added filter, only ever increases so removed ids are not handed out again
+                        dcc.Store(id="filter-next-id", data=max([item["id"] for item in filter_state], default=0) + 1)
                     ]
                 ),
                 html.Div(
@@ -230,20 +243,21 @@ def return_table_header():
             )
 
 #5) Table after filters
-def return_filter_table(dataframe):
-    """Returns a display filter table."""
+def return_filter_table(columns, page_size=10):
+    """Returns a display filter table paged and sorted on the server, its rows are filled in by the first table callback."""
     table_object = html.Div(
         children=[
             dash_table.DataTable(
                 id="table-id",
-                columns = [{"name": i, "id": i} for i in dataframe.columns],
-                data = dataframe.to_dict("records"),
+                columns = [{"name": i, "id": i} for i in columns],
+                data = [],
                 style_data_conditional=[],
-                sort_action="native",
+                sort_action="custom",
                 sort_mode="multi",
-                page_action="native",
+                sort_by=[],
+                page_action="custom",
                 page_current=0,
-                page_size=10,
+                page_size=page_size,
             )
         ],
         style={"overflow":"scroll", "margin-left":"50px", "border":"2px black solid"}
@@ -254,13 +268,24 @@ def return_filter_table(dataframe):
         style = {"margin-top":"20px"}
     )
 
-#6) Table download button
+#6) Table download buttons
 def return_download_button():
-    """Returns a download button."""
+    """Returns download links (CSV and Parquet) of the server-side export, their href carries the filter state."""
     return html.Div(
         [
-            html.Button("Download CSV", id="btn_csv"),
-            dcc.Download(id="download-dataframe-csv"),
+            html.A(
+                html.Button("Download CSV"),
+                id="btn_csv",
+                href="/export/data.csv",
+                download="data.csv",
+                style={"margin-right":"10px"}
+            ),
+            html.A(
+                html.Button("Download Parquet"),
+                id="btn_parquet",
+                href="/export/data.parquet",
+                download="data.parquet"
+            ),
         ],
         style={"text-align":"center"}
     )
@@ -291,13 +316,56 @@ def return_bottom_half_divs(header_div, button, table_div):
         ],
         style={"height":"500px", "width":"1300px"}
     )
+#9) Dataset selector
+def return_dataset_selector(names, current):
+    """Returns dropdown of the hosted datasets, selecting one navigates to its page."""
+    return html.Div(
+        children=[
+            dcc.Dropdown(
+                id="dataset-selector",
+                options=[{"label": name, "value": name} for name in names],
+                value=current,
+                style={"width":"200px"},
+                clearable=False
+            )
+        ],
+        style={"display":"flex", "justify-content":"center"}
+    )
+
 ####################### Page layout #######################
 
-def create_layout(df):
+def create_page_shell(page_content=None, page_key=None):
+    """
+    Returns light page skeleton, the page content of the dataset named by the URL path is filled in once the dataset is loaded. With page_content the skeleton is served with the page already in it
+    """
+    return html.Div(
+        children=[
+            dcc.Location(id="url", refresh=False),
+            # one id per browser tab, filled in on the client so the skeleton stays cacheable; newer requests of a session supersede its older ones
+            dcc.Store(id="session-id", storage_type="session"),
+            # dataset version of the page shown, the page is not sent again for it
+            dcc.Store(id="page-key", data=page_key),
+            dcc.Interval(id="loading-interval", interval=1000, disabled=page_content is not None),
+            html.Div(id="page-content", children=create_loading_layout() if page_content is None else page_content)
+        ]
+    )
+
+def create_loading_layout(message="Loading dataset..."):
+    """
+    Returns page content shown while the dataset loads
+    """
+    return [
+        return_header(),
+        html.H5(
+            children=message,
+            style={"text-align":"center"}
+        )
+    ]
+
+def create_layout(df, stats, axes=None, dataset_names=(), dataset=None, filter_rows=(), filter_state=()):
     """
-    Returns page layout
+    Returns page layout, showing the filter rows of filter_state when a linked view is opened
     """
-    features = df.columns
 
     #######################################################
     ################## Get page elements ##################
@@ -305,14 +373,14 @@ def create_layout(df):
 
     #1) Page Header
     header_div = return_header()
-    #2) Scatter Plot
-    scatter_plot_div = return_scatter_plot_div(features[2:])
+    #2) Scatter Plot (default axes from the dataset schema)
+    scatter_plot_div = return_scatter_plot_div(features(stats), *default_axes(stats, axes))
     #3) Add Filters
-    filter_div = return_filter_div()
+    filter_div = return_filter_div(filter_rows, filter_state)
     #4) Table header div
     table_header_div = return_table_header()
     #5) Table after filters
-    table_div = return_filter_table(df)
+    table_div = return_filter_table(df.columns, config.TABLE_PAGE_SIZE)
     #6) Download Data Button
     download_data_object = return_download_button()
 
@@ -341,10 +409,9 @@ def create_layout(df):
         ]
     )
 
-    # Final arrangement
+    # Final arrangement, with a dataset selector when several datasets are hosted
     return html.Div(
-        children=[
-            header_div,
-            page_div
-        ]
+        children=[header_div]
+        + ([return_dataset_selector(dataset_names, dataset)] if len(dataset_names) > 1 else [])
+        + [page_div]
     )
\ No newline at end of file
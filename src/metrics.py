@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import functools
+from collections import Counter
+from collections import defaultdict
+
+import flask
+
+import config
+
+# Upper bounds in seconds of the callback latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DASH_UPDATE_PATH = "/_dash-update-component"
+
+#################### Metrics registry ####################
+
+def format_value(value):
+    """Returns sample value text, integral values without exponent."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metrics:
+    """
+    Per callback totals of wall time, filter evaluation time, serialization time, response bytes and rows touched. With a shared directory every worker process snapshots its counters there and /metrics reports the sum over all workers
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: defaultdict(float))
+        self.buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.directory = None
+        # process the counters belong to, a forked worker starts its own file
+        self.pid = None
+        self.path = None
+
+    def share(self, directory):
+        """Aggregates the counters of every process using directory, called before forking the workers."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def save(self):
+        """Writes a snapshot of this process's counters into the shared directory (a small file replaced after every request)."""
+        if self.directory is None:
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                # counters inherited across fork belong to the parent
+                if self.pid is not None:
+                    self.totals.clear()
+                    self.buckets.clear()
+                self.pid = os.getpid()
+                # unique per process, a reused pid does not overwrite the counters of an exited worker
+                self.path = os.path.join(self.directory, f"{self.pid}-{uuid.uuid4().hex[:8]}.json")
+            snapshot = {"totals": self.totals, "buckets": self.buckets}
+            body = json.dumps(snapshot)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(body)
+        os.replace(tmp_path, self.path)
+
+    def merged(self):
+        """Returns (totals, buckets) of this process, or summed over every process of the shared directory."""
+        if self.directory is None:
+            return self.totals, self.buckets
+
+        self.save()
+        totals = defaultdict(lambda: defaultdict(float))
+        buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for callback, values in snapshot["totals"].items():
+                for key, value in values.items():
+                    totals[callback][key] += value
+            for callback, counts in snapshot["buckets"].items():
+                buckets[callback] = [total + count for total, count in zip(buckets[callback], counts)]
+        return totals, buckets
+
+    def observe(self, callback, seconds, filter_seconds, serialize_seconds, response_bytes, rows):
+        """Adds one callback request."""
+        with self.lock:
+            totals = self.totals[callback]
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["filter_seconds"] += filter_seconds
+            totals["serialize_seconds"] += serialize_seconds
+            totals["response_bytes"] += response_bytes
+            totals["rows"] += rows
+
+            buckets = self.buckets[callback]
+            for ind, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[ind] += 1
+                    break
+            else:
+                buckets[-1] += 1
+        self.save()
+
+    def supersede(self, callback):
+        """Counts one request that returned early because a newer one superseded it."""
+        with self.lock:
+            self.totals[callback]["superseded"] += 1
+        self.save()
+
+    def prometheus(self):
+        """Returns metrics in the Prometheus text exposition format."""
+        counters = [
+            ("calls", "umami_callback_calls_total", "Callback requests."),
+            ("seconds", "umami_callback_seconds_total", "Wall time spent in callbacks."),
+            ("filter_seconds", "umami_callback_filter_seconds_total", "Time spent evaluating filters."),
+            ("serialize_seconds", "umami_callback_serialize_seconds_total", "Time spent serializing callback responses."),
+            ("response_bytes", "umami_callback_response_bytes_total", "Bytes of callback responses."),
+            ("rows", "umami_callback_rows_total", "Rows touched by filter evaluation."),
+            ("superseded", "umami_callback_superseded_total", "Requests returned early because a newer request for the same output superseded them."),
+        ]
+
+        all_totals, all_buckets = self.merged()
+        with self.lock:
+            lines = []
+            for key, name, help_text in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for callback, totals in sorted(all_totals.items()):
+                    lines.append(f'{name}{{callback="{callback}"}} {format_value(totals[key])}')
+
+            name = "umami_callback_latency_seconds"
+            lines += [f"# HELP {name} Callback wall time.", f"# TYPE {name} histogram"]
+            for callback, buckets in sorted(all_buckets.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{callback="{callback}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{callback="{callback}"}} {format_value(all_totals[callback]["seconds"])}')
+                lines.append(f'{name}_count{{callback="{callback}"}} {cumulative}')
+
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+#################### Sampling profiler ####################
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread at a fixed interval, collapsed into flame graph lines ("frame;frame;frame count")
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        self.running.set()
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.thread.join()
+
+    def sample(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def dump(self, path):
+        """Writes collapsed stacks, readable by flamegraph.pl and speedscope."""
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+#################### Helper Functions ####################
+
+#1) Record filter evaluation of the current request
+def record_filter(seconds, rows):
+    """Adds filter evaluation time and rows touched to the current request."""
+    if flask.has_request_context():
+        flask.g.umami_filter_seconds = flask.g.get("umami_filter_seconds", 0.0) + seconds
+        flask.g.umami_rows = flask.g.get("umami_rows", 0) + rows
+
+#2) Time a callback
+def timed_callback(func):
+    """Returns callback function that records its name and wall time on the current request."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if flask.has_request_context():
+                flask.g.umami_callback = func.__name__
+                flask.g.umami_callback_seconds = time.perf_counter() - start
+    return wrapper
+
+#################### Instrumentation ####################
+
+def instrument(app):
+    """
+    Wraps every callback registered afterwards on the Dash app and exposes the metrics on /metrics of its Flask server
+    """
+    register_callback = app.callback
+
+    @functools.wraps(register_callback)
+    def callback(*args, **kwargs):
+        decorator = register_callback(*args, **kwargs)
+        return lambda func: decorator(timed_callback(func))
+
+    app.callback = callback
+    server = app.server
+
+    @server.before_request
+    def start_request():
+        if flask.request.path != DASH_UPDATE_PATH:
+            return
+        flask.g.umami_start = time.perf_counter()
+        if config.PROFILE_SLOW_MS is not None:
+            flask.g.umami_profiler = SamplingProfiler(threading.get_ident(), config.PROFILE_INTERVAL_MS / 1000)
+            flask.g.umami_profiler.start()
+
+    @server.after_request
+    def end_request(response):
+        if "umami_start" not in flask.g:
+            return response
+
+        elapsed = time.perf_counter() - flask.g.umami_start
+        callback_name = flask.g.get("umami_callback", "unknown")
+        callback_seconds = flask.g.get("umami_callback_seconds", 0.0)
+        response_bytes = 0 if response.is_streamed else len(response.get_data())
+
+        METRICS.observe(
+            callback_name,
+            callback_seconds,
+            flask.g.get("umami_filter_seconds", 0.0),
+            # dispatch time outside the callback is spent serializing the response
+            max(elapsed - callback_seconds, 0.0),
+            response_bytes,
+            flask.g.get("umami_rows", 0)
+        )
+
+        profiler = flask.g.get("umami_profiler")
+        if profiler is not None:
+            profiler.stop()
+            if elapsed * 1000 > config.PROFILE_SLOW_MS:
+                os.makedirs(config.PROFILE_DIR, exist_ok=True)
+                profiler.dump(os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{callback_name}-{int(elapsed * 1000)}ms.folded"))
+
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return flask.Response(METRICS.prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return app
@@ -1,23 +1,74 @@
-import pickle
 import pandas as pd
 import numpy as np
-    
-def read(schema_file, data_file):
+
+from store import read_meta
+from store import current_dir
+from store import map_column
+from store import map_validity
+
+#################### Helper Functions ####################
+
+#1) Identifier column
+def to_categorical(codes, categories):
+    """Returns categorical with lexicographically sorted categories from dictionary codes (-1 is null)."""
+    categories = np.array(categories, dtype=object)
+    order = np.argsort(categories, kind="mergesort")
+    # remap codes to the sorted category positions, keeping -1 for null
+    remap = np.empty(len(categories) + 1, dtype=np.int32)
+    remap[order] = np.arange(len(categories), dtype=np.int32)
+    remap[-1] = -1
+    return pd.Categorical.from_codes(remap[codes], categories[order])
+
+#2) Nullable integer column
+def to_nullable_int(values, validity):
+    """Returns nullable integer array over the stored values."""
+    return pd.arrays.IntegerArray(np.asarray(values), ~validity)
+
+#3) Per-column memory use
+def memory_report(dataframe):
+    """Returns dtype and memory use in bytes of every column."""
+    return pd.DataFrame({
+        "dtype": dataframe.dtypes.astype(str),
+        "bytes": dataframe.memory_usage(index=False, deep=True)
+    })
+
+#################### Read dataset ####################
+
+def read(store_dir, columns=None):
     """
-    Reads schema file and data file to generate content dataframe
+    Memory maps the columnar store to generate content dataframe (optionally only the given columns)
     """
-    with open(schema_file, "rb") as file:
-        # List of 39 dictionaries each with keys name, type, baseType
-        schema = pickle.load(file)
-    with open(data_file, "rb") as file:
-        # List of lists with shape 1987 x 39
-        data = pickle.load(file)
-        data = np.array(data)
-
-    schema_names = list(map(lambda dictionary: dictionary["name"], schema))
-    
+    # current dataset version of a versioned store
+    store_dir = current_dir(store_dir)
+    meta = read_meta(store_dir)
+    # Row count of every column in the store (1987 for the umami dataset)
+    n_rows = meta["n_rows"]
+
     content = {}
-    for ind, name in enumerate(schema_names):
-        content[name] = list(data[:, ind])
+    for column in meta["columns"]:
+        name = column["name"]
+        if columns is not None and name not in columns:
+            continue
+
+        values = map_column(store_dir, column, n_rows)
+        kind = column["kind"]
+        if kind == "category":
+            values = to_categorical(values, column["categories"])
+        elif kind == "int":
+            values = to_nullable_int(values, map_validity(store_dir, column, n_rows))
+
+        content[name] = values
+
+    # float columns are wrapped without copying or consolidating into one block (pandas >= 2.0), pages are loaded on first touch
+    dataframe = pd.DataFrame(content, copy=False)
+    dataframe.attrs["version"] = meta.get("version")
+    # version directory, derived data (column indexes) is kept next to the columns
+    dataframe.attrs["directory"] = store_dir
+    return dataframe
+
+if __name__ == "__main__":
+    import config
 
-    return pd.DataFrame(content)
+    report = memory_report(read(config.STORE_DIR))
+    print(report.to_string())
+    print("Total bytes:", report["bytes"].sum())
@@ -0,0 +1,103 @@
+import os
+import shutil
+import signal
+import socket
+import argparse
+import tempfile
+
+from werkzeug.serving import make_server
+
+import config
+from app import create_app
+from app import callback_func
+from dataset import DatasetRegistry
+from metrics import METRICS
+
+#################### Helper Functions ####################
+
+#1) Listening socket shared by every worker
+def listen(host, port, backlog=128):
+    """Returns bound, listening TCP socket."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+#2) Worker process
+def run_worker(server, host, port, sock, registry):
+    """Serves the WSGI app on the inherited socket until terminated."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # threads do not survive fork, every worker loads (fast start) and picks up new dataset versions itself
+    registry.start_refreshers()
+    make_server(host, port, server, threaded=True, fd=sock.fileno()).serve_forever()
+
+#3) Fork a worker
+def spawn(server, host, port, sock, registry):
+    """Returns pid of a new worker process."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(server, host, port, sock, registry)
+        finally:
+            os._exit(0)
+    return pid
+
+#################### Production server ####################
+
+def serve(host, port, workers, fast_start=False):
+    """
+    Loads the default dataset once and serves the app from a pool of forked worker processes sharing one listening socket. Workers inherit the memory mapped dataset, statistics and layout, so dataset memory does not multiply with the worker count. With fast_start workers accept requests right away and load the dataset in the background. Other hosted datasets are loaded by each worker on first use
+    """
+    app = create_app()
+    registry = DatasetRegistry(config.DATASETS, config.DATASET_MEMORY_BYTES)
+    if not fast_start:
+        # read only memory map, pages are shared by every worker through the page cache
+        registry.loader(config.DEFAULT_DATASET, background=False)
+    callback_func(app, registry)
+
+    # every worker snapshots its counters here, /metrics on any worker reports the sum over all of them
+    metrics_dir = tempfile.mkdtemp(prefix="umami-metrics-")
+    METRICS.share(metrics_dir)
+
+    sock = listen(host, port)
+    pids = {spawn(app.server, host, port, sock, registry) for _ in range(workers)}
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # replace workers that exit unexpectedly
+    while pids:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        pids.discard(pid)
+        if not stopping:
+            pids.add(spawn(app.server, host, port, sock, registry))
+
+    sock.close()
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the app with a pool of worker processes.")
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--workers", type=int, default=config.WORKERS)
+    parser.add_argument("--fast-start", action="store_true", help="accept requests before the dataset is loaded")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.fast_start)
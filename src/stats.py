@@ -0,0 +1,83 @@
+import numpy as np
+
+import config
+from filters import column_values
+from store import ID_COLUMNS
+
+# Quantiles kept per column
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+#################### Helper Functions ####################
+
+#1) Histogram of one column
+def column_histogram(valid, min_val, max_val, is_int, bins):
+    """
+    Returns {"edges", "cumulative"} of the non-null values, cumulative[i] rows below edges[i] and cumulative[-1] all of them, so the rows of any range are a difference of two prefix sums. Integer features with at most bins distinct values get one bin per integer (range counts are exact)
+    """
+    if is_int and max_val - min_val < bins:
+        edges = np.arange(min_val - 0.5, max_val + 1.0)
+    elif min_val == max_val:
+        edges = np.array([min_val - 0.5, max_val + 0.5])
+    else:
+        edges = np.linspace(min_val, max_val, bins + 1)
+
+    counts, _ = np.histogram(valid, bins=edges)
+    return {
+        "edges": edges.tolist(),
+        "cumulative": np.concatenate([[0], np.cumsum(counts)]).tolist()
+    }
+
+#2) Statistics of one column
+def column_stats(values):
+    """Returns min, max, integrality, null count, distinct count, quantiles and histogram of a float array (nulls as NaN)."""
+    null_mask = np.isnan(values)
+    valid = values[~null_mask]
+
+    if len(valid) == 0:
+        return {
+            "min": None,
+            "max": None,
+            "is_int": False,
+            "null_count": int(null_mask.sum()),
+            "distinct": 0,
+            "quantiles": [None] * len(QUANTILES),
+            "histogram": None
+        }
+
+    is_int = bool(np.all(np.mod(valid, 1) == 0))
+    cast = int if is_int else float
+    min_val, max_val = cast(valid.min()), cast(valid.max())
+    return {
+        "min": min_val,
+        "max": max_val,
+        "is_int": is_int,
+        "null_count": int(null_mask.sum()),
+        "distinct": int(len(np.unique(valid))),
+        "quantiles": [float(val) for val in np.quantile(valid, QUANTILES)],
+        "histogram": column_histogram(valid, min_val, max_val, is_int, config.HISTOGRAM_BINS)
+    }
+
+#3) Features with statistics
+def features(stats):
+    """Returns filterable feature names in dataset column order."""
+    return list(stats)
+
+#4) Default scatter plot axes
+def default_axes(stats, axes=None):
+    """Returns (x, y) default features, the preferred axes when the dataset has them, else its first two features with values."""
+    names = features(stats)
+    if axes is not None and all(axis in stats for axis in axes):
+        return tuple(axes)
+    with_values = [feat for feat in names if stats[feat]["min"] is not None] or names
+    return with_values[0], with_values[min(1, len(with_values) - 1)]
+
+#################### Statistics catalog ####################
+
+def compute_stats(dataframe, id_columns=ID_COLUMNS):
+    """
+    Returns catalog {feature: column statistics} of every numeric feature, built once at load
+    """
+    return {
+        column: column_stats(column_values(dataframe, column))
+        for column in dataframe.columns[id_columns:]
+    }
@@ -0,0 +1,293 @@
+import os
+import json
+import uuid
+import shutil
+
+import numpy as np
+
+import config
+
+# Leading identifier columns are stored as categories, the remaining columns as numeric features
+ID_COLUMNS = 2
+# Rows buffered in memory before a chunk is written (multiple of 8 to keep validity bitmaps byte aligned)
+CHUNK_ROWS = 65536
+
+META_FILE = "meta.json"
+# Name of the version directory currently served, stores without it are read from their own directory
+CURRENT_FILE = "CURRENT"
+
+# Schema type/baseType names of integer features
+INT_TYPES = {"int", "integer", "long", "bigint", "smallint", "tinyint"}
+
+#################### Helper Functions ####################
+
+#1) Column file names
+def data_file(cind):
+    """Returns file name of the typed values of a column."""
+    return f"{cind}.bin"
+
+def validity_file(cind):
+    """Returns file name of the validity bitmap of a column."""
+    return f"{cind}.valid"
+
+#2) Column kind from schema
+def column_kind(column_schema, cind):
+    """Returns storage kind of a column ("category", "int" or "float") from its schema type/baseType."""
+    if cind < ID_COLUMNS:
+        return "category"
+    types = {str(column_schema.get(key, "")).lower() for key in ("type", "baseType")}
+    if types & INT_TYPES:
+        return "int"
+    # float features and untyped columns
+    return "float"
+
+#3) On disk dtype of a column kind
+def kind_dtype(kind):
+    """Returns numpy dtype name of the stored values of a column kind."""
+    return {"category": "int32", "int": "int64", "float": config.FLOAT_DTYPE}[kind]
+
+#4) Current version directory
+def current_dir(store_dir):
+    """Returns directory of the current dataset version of a store."""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE)) as file:
+            return os.path.join(store_dir, file.read().strip())
+    except FileNotFoundError:
+        return store_dir
+
+#5) Read store metadata
+def read_meta(directory):
+    """Returns store metadata (schema, row count and column descriptions)."""
+    with open(os.path.join(directory, META_FILE)) as file:
+        return json.load(file)
+
+#6) Publish a version
+def publish_version(store_dir, version):
+    """Atomically points the store at a completely written version directory."""
+    path = os.path.join(store_dir, CURRENT_FILE)
+    with open(path + ".tmp", "w") as file:
+        file.write(version)
+    os.replace(path + ".tmp", path)
+
+#7) Remove old versions
+def prune_versions(store_dir, keep):
+    """Removes all but the newest keep version directories (the current one is always kept)."""
+    current = os.path.basename(current_dir(store_dir))
+    versions = sorted(
+        (entry for entry in os.scandir(store_dir) if entry.is_dir() and os.path.exists(os.path.join(entry.path, META_FILE))),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    for entry in versions[keep:]:
+        if entry.name != current:
+            # open memory maps of a removed version stay valid until unmapped
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+#8) Memory map a column
+def map_column(directory, column, n_rows):
+    """Returns read-only memory map of the typed values of a column."""
+    if n_rows == 0:
+        return np.empty(0, dtype=column["dtype"])
+    return np.memmap(
+        os.path.join(directory, column["file"]),
+        dtype=column["dtype"],
+        mode="r",
+        shape=(n_rows,)
+    )
+
+#9) Memory map a validity bitmap
+def map_validity(directory, column, n_rows):
+    """Returns boolean validity (True where the value is not null) of a column."""
+    if n_rows == 0:
+        return np.empty(0, dtype=bool)
+    bits = np.memmap(
+        os.path.join(directory, column["validity"]),
+        dtype=np.uint8,
+        mode="r"
+    )
+    return np.unpackbits(bits, count=n_rows).astype(bool)
+
+#10) Column index files
+def index_files(column):
+    """Returns file names of the sorted values and row positions of a column index."""
+    stem = os.path.splitext(column["file"])[0]
+    return f"{stem}.sorted", f"{stem}.order"
+
+#11) Write a column index
+def write_index(directory, column, sorted_values, positions):
+    """Writes sorted values (float64) and row positions (int32/int64) of a column index, each file atomically."""
+    for name, array in zip(index_files(column), (sorted_values, positions)):
+        path = os.path.join(directory, name)
+        # unique temporary name, several processes may build the same index
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        np.asarray(array).tofile(tmp)
+        os.replace(tmp, path)
+
+#12) Memory map a column index
+def map_index(directory, column, n_rows):
+    """Returns read-only memory maps (sorted values, row positions) of a column index, None when not stored."""
+    values_path, positions_path = (os.path.join(directory, name) for name in index_files(column))
+    if not (os.path.exists(values_path) and os.path.exists(positions_path)):
+        return None
+    dtype = np.int32 if n_rows < 2 ** 31 else np.int64
+    n_valid = os.path.getsize(positions_path) // np.dtype(dtype).itemsize
+    if n_valid == 0 or os.path.getsize(values_path) != n_valid * 8:
+        # empty files can not be memory mapped, partial files are rebuilt
+        return None
+    return (
+        np.memmap(values_path, dtype=np.float64, mode="r", shape=(n_valid,)),
+        np.memmap(positions_path, dtype=dtype, mode="r", shape=(n_valid,))
+    )
+
+#################### Store writer ####################
+
+class StoreWriter:
+    """
+    Writes row-major records into a columnar store: one typed array per column, one validity bitmap per column and the schema as metadata
+    """
+
+    def __init__(self, directory, schema, chunk_rows=CHUNK_ROWS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.schema = schema
+        self.kinds = [column_kind(column_schema, cind) for cind, column_schema in enumerate(schema)]
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self.n_columns = None
+        self.rows = []
+        self.data_files = []
+        self.validity_files = []
+        # per identifier column: category -> code
+        self.categories = {}
+
+    def open_columns(self, n_columns):
+        """Opens one data file and one validity file per column."""
+        self.n_columns = n_columns
+        for cind in range(n_columns):
+            self.data_files.append(open(os.path.join(self.directory, data_file(cind)), "wb"))
+            self.validity_files.append(open(os.path.join(self.directory, validity_file(cind)), "wb"))
+            if self.kinds[cind] == "category":
+                self.categories[cind] = {}
+
+    def append(self, rows):
+        """Buffers rows and writes every full chunk."""
+        for row in rows:
+            if self.n_columns is None:
+                self.open_columns(len(row))
+            self.rows.append(row)
+            if len(self.rows) == self.chunk_rows:
+                self.flush()
+
+    def append_columns(self, columns):
+        """Writes a chunk given as one numpy array per column (strings for identifiers, floats with NaN as null for features)."""
+        if self.n_columns is None:
+            self.open_columns(len(columns))
+        # keep row order with rows buffered by append
+        self.flush()
+
+        arrays, valids = [], []
+        for cind, values in enumerate(columns):
+            kind = self.kinds[cind]
+            if kind == "category":
+                values = np.asarray(values, dtype=object)
+                valid = values != None
+                # encode distinct values of the chunk only
+                uniques, inverse = np.unique(values[valid].astype(str), return_inverse=True)
+                codes = self.categories[cind]
+                unique_codes = np.array([codes.setdefault(val, len(codes)) for val in uniques.tolist()], dtype=np.int32)
+                array = np.full(len(values), -1, dtype=np.int32)
+                array[valid] = unique_codes[inverse]
+            else:
+                values = np.asarray(values, dtype=np.float64)
+                valid = ~np.isnan(values)
+                if kind == "int":
+                    array = np.where(valid, values, 0).astype(np.int64)
+                else:
+                    array = values.astype(kind_dtype(kind))
+            arrays.append(array)
+            valids.append(valid)
+
+        self.write_chunk(arrays, valids)
+
+    def write_chunk(self, arrays, valids):
+        """Appends typed arrays and validity bitmaps of one chunk to the column files."""
+        if self.n_rows % 8:
+            raise ValueError("Only the last chunk may have a row count that is not a multiple of 8")
+        for cind in range(self.n_columns):
+            arrays[cind].tofile(self.data_files[cind])
+            np.packbits(valids[cind]).tofile(self.validity_files[cind])
+        self.n_rows += len(arrays[0])
+
+    def flush(self):
+        """Writes buffered rows column by column."""
+        if not self.rows:
+            return
+
+        arrays, valids = [], []
+        for cind in range(self.n_columns):
+            values = [row[cind] for row in self.rows]
+            valid = np.array([val is not None for val in values])
+
+            kind = self.kinds[cind]
+            if kind == "category":
+                # dictionary encode identifiers, -1 for null
+                codes = self.categories[cind]
+                array = np.array(
+                    [-1 if val is None else codes.setdefault(str(val), len(codes)) for val in values],
+                    dtype=np.int32
+                )
+            elif kind == "int":
+                # null slots hold 0, the validity bitmap marks them
+                array = np.array(
+                    [0 if val is None else int(float(val)) for val in values],
+                    dtype=np.int64
+                )
+            else:
+                array = np.array(
+                    [np.nan if val is None else float(val) for val in values],
+                    dtype=kind_dtype(kind)
+                )
+            arrays.append(array)
+            valids.append(valid)
+
+        self.write_chunk(arrays, valids)
+        self.rows = []
+
+    def discard(self):
+        """Closes the column files without writing the metadata, the directory is left for the caller to remove."""
+        for file in self.data_files + self.validity_files:
+            file.close()
+
+    def close(self, **meta):
+        """Writes remaining rows and the store metadata."""
+        self.flush()
+        for file in self.data_files + self.validity_files:
+            file.close()
+
+        columns = []
+        for cind, column_schema in enumerate(self.schema):
+            kind = self.kinds[cind]
+            column = {
+                "name": column_schema["name"],
+                "file": data_file(cind),
+                "validity": validity_file(cind),
+                "kind": kind,
+                "dtype": kind_dtype(kind)
+            }
+            if kind == "category":
+                column["categories"] = list(self.categories.get(cind, {}))
+            columns.append(column)
+
+        # version identifies the dataset in derived caches
+        meta.setdefault("version", uuid.uuid4().hex)
+        meta.update({
+            "schema": self.schema,
+            "n_rows": self.n_rows,
+            "columns": columns
+        })
+
+        # metadata is written last so a partially written store is never read
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump(meta, file)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,108 @@
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from store import StoreWriter
+from store import CHUNK_ROWS
+
+# Shape of the umami dataset: 2 identifier columns and 37 numeric features
+N_FEATURES = 37
+# Fraction of null feature values
+NULL_RATE = 0.1
+# Every INT_EVERY-th feature holds integer values
+INT_EVERY = 4
+
+#################### Helper Functions ####################
+
+#1) Synthetic schema
+def make_schema(n_features=N_FEATURES):
+    """Returns schema with the umami column layout (identifier, structure, numeric features)."""
+    schema = [
+        {"name": "id", "type": "string", "baseType": "string"},
+        {"name": "structure", "type": "string", "baseType": "string"}
+    ]
+    for find in range(n_features):
+        kind = "int" if find % INT_EVERY == 0 else "real"
+        schema.append({"name": f"feature_{find}", "type": kind, "baseType": kind})
+    return schema
+
+#2) Synthetic columns
+def make_columns(schema, start, n_rows, null_rate=NULL_RATE, seed=0):
+    """Returns one numpy array per schema column for rows [start, start + n_rows), floats with NaN as null for features."""
+    rng = np.random.default_rng([seed, start])
+    columns = [
+        np.char.add("sample_", np.arange(start, start + n_rows).astype(str)).astype(object),
+        np.char.add("structure_", (np.arange(start, start + n_rows) % 16).astype(str)).astype(object)
+    ]
+    for column_schema in schema[2:]:
+        if column_schema["type"] == "int":
+            values = rng.integers(0, 100, n_rows).astype(np.float64)
+        else:
+            values = rng.normal(0, 1, n_rows)
+        values[rng.random(n_rows) < null_rate] = np.nan
+        columns.append(values)
+    return columns
+
+#################### Synthetic datasets ####################
+
+#1) In memory dataframe
+def make_dataframe(n_rows, n_features=N_FEATURES, null_rate=NULL_RATE, seed=0):
+    """
+    Returns synthetic dataframe with the dtypes read() produces
+    """
+    schema = make_schema(n_features)
+    columns = make_columns(schema, 0, n_rows, null_rate, seed)
+
+    content = {}
+    for column_schema, values in zip(schema, columns):
+        name = column_schema["name"]
+        if column_schema["type"] == "string":
+            content[name] = pd.Categorical(values)
+        elif column_schema["type"] == "int":
+            content[name] = pd.array(values, dtype="Int64")
+        else:
+            content[name] = values
+    return pd.DataFrame(content)
+
+#2) Columnar store
+def write_store(store_dir, n_rows, n_features=N_FEATURES, null_rate=NULL_RATE, seed=0):
+    """
+    Writes synthetic dataset into a columnar store chunk by chunk
+    """
+    schema = make_schema(n_features)
+    writer = StoreWriter(store_dir, schema)
+    for start in range(0, n_rows, CHUNK_ROWS):
+        writer.append_columns(make_columns(schema, start, min(CHUNK_ROWS, n_rows - start), null_rate, seed))
+    writer.close(version=f"synthetic-{n_rows}-{seed}")
+
+#3) umami.json document
+def write_json(path, n_rows, n_features=N_FEATURES, null_rate=NULL_RATE, seed=0):
+    """
+    Writes synthetic dataset in the {"schema": [...], "data": [[...], ...]} format served at config.URL
+    """
+    schema = make_schema(n_features)
+    columns = make_columns(schema, 0, n_rows, null_rate, seed)
+
+    with open(path, "w") as file:
+        file.write('{"schema": ' + json.dumps(schema) + ', "data": [')
+        for rind in range(n_rows):
+            row = [None if values[rind] != values[rind] else values[rind] for values in columns]
+            row = [val.item() if isinstance(val, np.generic) else val for val in row]
+            file.write(("," if rind else "") + json.dumps(row))
+        file.write("]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset with the umami schema shape.")
+    parser.add_argument("--rows", type=int, default=1987)
+    parser.add_argument("--null-rate", type=float, default=NULL_RATE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--store", help="write a columnar store to this directory")
+    parser.add_argument("--json", help="write an umami.json document to this path (serve it with python -m http.server to test get.py)")
+    args = parser.parse_args()
+
+    if args.store:
+        write_store(args.store, args.rows, null_rate=args.null_rate, seed=args.seed)
+    if args.json:
+        write_json(args.json, args.rows, null_rate=args.null_rate, seed=args.seed)
@@ -0,0 +1,59 @@
+from math import ceil
+
+import numpy as np
+
+from filters import FAILS
+
+#################### Helper Functions ####################
+
+#1) Rows shown in the sample table
+def filtered_positions(codes):
+    """Returns positional indices of rows that are not excluded by the filters (satisfied and unknown rows)."""
+    return np.flatnonzero(codes != FAILS)
+
+#2) Sort filtered rows
+def sort_positions(dataframe, positions, sort_by):
+    """Returns positions reordered by the DataTable sort_by list ([{"column_id": ..., "direction": "asc"/"desc"}, ...]), nulls last."""
+    if not sort_by:
+        return positions
+
+    columns = [sort["column_id"] for sort in sort_by]
+    ascending = [sort["direction"] == "asc" for sort in sort_by]
+
+    # only the sorted columns of the filtered rows are touched
+    subset = dataframe[columns].iloc[positions].reset_index(drop=True)
+    order = subset.sort_values(
+        by=columns,
+        ascending=ascending,
+        na_position="last",
+        kind="mergesort"
+    ).index.to_numpy()
+    return positions[order]
+
+#3) Page count
+def page_count(n_rows, page_size):
+    """Returns number of pages (at least one) for n_rows rows."""
+    return max(1, ceil(n_rows / page_size))
+
+#4) Table records
+def to_records(dataframe):
+    """Returns DataTable records with nulls as None."""
+    dataframe = dataframe.astype(object)
+    return dataframe.where(dataframe.notna(), None).to_dict("records")
+
+#################### Table page ####################
+
+def table_page(dataframe, codes, page_current, page_size, sort_by):
+    """
+    Returns (records of the requested page, page count, page index) of the filtered and sorted view
+    """
+    positions = filtered_positions(codes)
+    n_pages = page_count(len(positions), page_size)
+    # keep page index in range after the filtered view shrinks
+    page_current = min(page_current or 0, n_pages - 1)
+
+    positions = sort_positions(dataframe, positions, sort_by)
+    start = page_current * page_size
+    page = dataframe.iloc[positions[start:start + page_size]]
+
+    return to_records(page), n_pages, page_current
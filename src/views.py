@@ -0,0 +1,36 @@
+import urllib.parse
+
+from werkzeug.datastructures import MultiDict
+
+from filters import filter_key
+from filters import decode_filter_query
+from stats import default_axes
+
+#################### Helper Functions ####################
+
+#1) View state from a URL query
+def decode_view_query(query, stats, axes=None):
+    """
+    Returns (x, y, features, bounds) of a page URL query (?x=...&y=...&feature=...&lb=...&ub=...). Unknown axes fall back to the default axes and filters of unknown features are dropped, raises ValueError for malformed filters
+    """
+    args = MultiDict(urllib.parse.parse_qsl((query or "").lstrip("?")))
+    default_x, default_y = default_axes(stats, axes)
+    xaxis = args.get("x") if args.get("x") in stats else default_x
+    yaxis = args.get("y") if args.get("y") in stats else default_y
+
+    features, bounds = decode_filter_query(args)
+    known = [ind for ind, feat in enumerate(features) if feat in stats]
+    return xaxis, yaxis, [features[ind] for ind in known], bounds[known]
+
+#2) Canonical view state
+def view_key(xaxis, yaxis, features, bounds):
+    """Returns hashable canonical form of the view state, the order of the filters does not matter."""
+    return (xaxis, yaxis, tuple(sorted(filter_key(features, bounds))))
+
+#3) Filter state of a view
+def view_filter_state(features, bounds):
+    """Returns filter state ([{"id", "feature", "bounds"}, ...]) of the view filters."""
+    return [
+        {"id": ind + 1, "feature": feat, "bounds": [float(lb), float(ub)]}
+        for ind, (feat, (lb, ub)) in enumerate(zip(features, bounds))
+    ]
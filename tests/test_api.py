@@ -0,0 +1,50 @@
+import types
+
+import numpy as np
+import pytest
+
+import synthetic
+from api import run_batch
+from filters import SATISFIES
+from filters import FAILS
+from filters import UNKNOWN
+from filters import categorize
+
+N_ROWS = 3000
+
+#################### Fixtures ####################
+
+@pytest.fixture(scope="module")
+def dataset():
+    dataframe = synthetic.make_dataframe(N_ROWS, n_features=4, null_rate=0.2, seed=5)
+    return types.SimpleNamespace(dataframe=dataframe, stats=set(dataframe.columns), indexes={}, version="test")
+
+#################### Filter API ####################
+
+def test_rows_match_categorize(dataset):
+    dataframe = dataset.dataframe
+    filter_sets = [
+        [("feature_0", 10, 60)],
+        [("feature_1", -0.5, 0.5), ("feature_2", -1, 2)],
+        [("feature_3", 0, 0)],
+        [("feature_0", 10, 60)]
+    ]
+    queries = [{"filters": [{"feature": feat, "lb": lb, "ub": ub} for feat, lb, ub in filters]} for filters in filter_sets]
+    body = {"queries": queries, "rows": ["satisfies", "fails"], "ids": True, "columns": ["feature_1"], "limit": 50}
+    response = run_batch(dataset, body)
+
+    assert response["n_rows"] == N_ROWS
+    for filters, result in zip(filter_sets, response["results"]):
+        features = [feat for feat, _, _ in filters]
+        codes = categorize(dataframe, features, np.array([[lb, ub] for _, lb, ub in filters], dtype=np.float64))
+        positions = np.flatnonzero(np.isin(codes, [SATISFIES, FAILS]))[:50]
+
+        assert result["counts"] == {
+            "satisfies": int((codes == SATISFIES).sum()),
+            "fails": int((codes == FAILS).sum()),
+            "unknown": int((codes == UNKNOWN).sum())
+        }
+        assert result["ids"] == list(dataframe["id"].iloc[positions].astype(str))
+        assert [row["feature_1"] for row in result["rows"]] == [
+            None if val != val else val for val in dataframe["feature_1"].iloc[positions]
+        ]
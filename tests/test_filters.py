@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import synthetic
+from index import load_indexes
+from filters import SATISFIES
+from filters import FAILS
+from filters import UNKNOWN
+from filters import categorize
+from filters import decode_filter_query
+from filters import batch_categorize
+
+N_ROWS = 5000
+N_FEATURES = 8
+
+#################### Fixtures ####################
+
+@pytest.fixture(scope="module")
+def dataframe():
+    return synthetic.make_dataframe(N_ROWS, n_features=N_FEATURES, null_rate=0.2, seed=3)
+
+@pytest.fixture(scope="module")
+def queries(dataframe):
+    """Returns random filter sets [(features, bounds), ...], wide and selective (index answered) ranges, repeated features included."""
+    rng = np.random.default_rng(7)
+    features = [name for name in dataframe.columns if name.startswith("feature_")]
+    queries = []
+    for _ in range(20):
+        n_filters = rng.integers(1, 5)
+        feats = list(rng.choice(features, n_filters))
+        bounds = []
+        for feat in feats:
+            values = dataframe[feat].to_numpy(dtype=np.float64, na_value=np.nan)
+            lb, ub = np.sort(rng.choice(values[~np.isnan(values)], 2))
+            bounds.append([lb, ub] if rng.random() < 0.5 else [lb, lb])
+        queries.append((feats, np.array(bounds, dtype=np.float64)))
+    return queries
+
+#################### Reference ####################
+
+def reference_codes(dataframe, features, bounds):
+    """Returns category code per row, evaluated row by row from the category definitions."""
+    codes = np.empty(len(dataframe), dtype=np.int8)
+    columns = [dataframe[feat].to_numpy(dtype=np.float64, na_value=np.nan) for feat in features]
+    for rind in range(len(dataframe)):
+        values = [column[rind] for column in columns]
+        if any(not np.isnan(val) and not lb <= val <= ub for val, (lb, ub) in zip(values, bounds)):
+            codes[rind] = FAILS
+        elif any(np.isnan(val) for val in values):
+            codes[rind] = UNKNOWN
+        else:
+            codes[rind] = SATISFIES
+    return codes
+
+#################### Filter engines ####################
+
+def test_serial(dataframe, queries):
+    for features, bounds in queries:
+        np.testing.assert_array_equal(categorize(dataframe, features, bounds), reference_codes(dataframe, features, bounds))
+
+def test_index(dataframe, queries):
+    indexes = load_indexes(dataframe, [name for name in dataframe.columns if name.startswith("feature_")])
+    for features, bounds in queries:
+        np.testing.assert_array_equal(
+            categorize(dataframe, features, bounds, indexes=indexes),
+            categorize(dataframe, features, bounds)
+        )
+
+@pytest.mark.parametrize("chunk_rows", [N_ROWS * 2, 777])
+def test_threaded(dataframe, queries, chunk_rows):
+    # one predicate per thread, then row chunks in parallel
+    with ThreadPoolExecutor(4) as pool:
+        for features, bounds in queries:
+            np.testing.assert_array_equal(
+                categorize(dataframe, features, bounds, pool=pool, chunk_rows=chunk_rows),
+                categorize(dataframe, features, bounds)
+            )
+
+@pytest.mark.parametrize("limit", [0, 1, 250, N_ROWS])
+def test_batch(dataframe, queries, limit):
+    # small chunks, positions are collected across several of them
+    keep = range(len(queries))
+    counts, rows = batch_categorize(dataframe, queries, keep=keep, categories=(SATISFIES, UNKNOWN), limit=limit, chunk_cells=4096)
+    for qind, (features, bounds) in enumerate(queries):
+        expected = categorize(dataframe, features, bounds)
+        np.testing.assert_array_equal(counts[qind], np.bincount(expected, minlength=3))
+        np.testing.assert_array_equal(rows[qind], np.flatnonzero(np.isin(expected, [SATISFIES, UNKNOWN]))[:limit])
+
+#################### Filter queries ####################
+
+@pytest.mark.parametrize("params, message", [
+    ([("feature", "feature_1"), ("lb", "0"), ("lb", "1"), ("ub", "2")], "Every feature needs one lb and one ub"),
+    ([("feature", "feature_1"), ("lb", "low"), ("ub", "2")], "Filter bounds must be numbers"),
+    ([("feature", "feature_1"), ("lb", "nan"), ("ub", "2")], "Filter bounds must not be NaN")
+])
+def test_decode_filter_query_errors(params, message):
+    with pytest.raises(ValueError, match=message):
+        decode_filter_query(MultiDict(params))
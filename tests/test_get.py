@@ -0,0 +1,75 @@
+import os
+import functools
+import threading
+import http.server
+
+import numpy as np
+import pytest
+
+import synthetic
+from get import ingest
+from read import read
+from store import current_dir
+from store import read_meta
+
+N_ROWS = 500
+N_FEATURES = 6
+
+#################### Fixtures ####################
+
+@pytest.fixture
+def server(tmp_path):
+    """Yields URL of a synthetic umami.json served by http.server (Last-Modified and If-Modified-Since, no ETag)."""
+    synthetic.write_json(tmp_path / "umami.json", N_ROWS, n_features=N_FEATURES, seed=1)
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/umami.json"
+    httpd.shutdown()
+    httpd.server_close()
+
+#################### Ingestion ####################
+
+def test_ingest_then_unchanged(server, tmp_path):
+    store_dir = str(tmp_path / "store")
+
+    # 200, a new version is written and published
+    assert ingest(server, store_dir)
+    version = read_meta(current_dir(store_dir))["version"]
+    assert read_meta(current_dir(store_dir))["last_modified"]
+
+    # 304, the stored validators skip the download
+    assert not ingest(server, store_dir)
+    assert read_meta(current_dir(store_dir))["version"] == version
+
+    # force downloads again
+    assert ingest(server, store_dir, force=True)
+    assert read_meta(current_dir(store_dir))["version"] != version
+
+def test_ingest_stored_values(server, tmp_path):
+    store_dir = str(tmp_path / "store")
+    assert ingest(server, store_dir)
+
+    schema = synthetic.make_schema(N_FEATURES)
+    columns = synthetic.make_columns(schema, 0, N_ROWS, seed=1)
+    dataframe = read(store_dir)
+
+    assert len(dataframe) == N_ROWS
+    assert list(dataframe.columns) == [column["name"] for column in schema]
+    for column_schema, values in zip(schema, columns):
+        stored = dataframe[column_schema["name"]]
+        if column_schema["type"] == "string":
+            assert list(stored.astype(str)) == list(values)
+        else:
+            np.testing.assert_array_equal(stored.to_numpy(dtype=np.float64, na_value=np.nan), values)
+
+def test_truncated_download_removed(server, tmp_path):
+    store_dir = str(tmp_path / "store")
+    path = tmp_path / "umami.json"
+    path.write_text(path.read_text()[:len(path.read_text()) // 2])
+
+    with pytest.raises(ValueError):
+        ingest(server, store_dir)
+    # the partial version is removed, only the lock file is left
+    assert os.listdir(store_dir) == [".lock"]